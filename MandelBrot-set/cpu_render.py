@@ -0,0 +1,403 @@
+import functools
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy
+
+
+def count_dtype(max_iters):
+    """Smallest unsigned integer type that holds iteration counts up to max_iters."""
+    return numpy.uint16 if max_iters < numpy.iinfo(numpy.uint16).max else numpy.uint32
+
+
+def escape_fraction(zx, zy):
+    """
+    Smooth-colouring fraction 1 - log(log2(|z|)) of escaped points from the
+    first z that escaped, in float32 like the fragment shader's map_color.
+    """
+    r = (zx * zx).astype(numpy.float32)
+    c = (zy * zy).astype(numpy.float32)
+    return 1 - numpy.log(numpy.log2(numpy.sqrt(r + c)))
+
+
+def view_axes(state, width, height, aspect=None):
+    """
+    Real part of every pixel column and imaginary part of every pixel row for
+    a mandelbrot.py state dict, using the same mapping as the fragment
+    shader's transform uniform.  Row 0 is the bottom of the view, as in
+    glDrawPixels.
+    """
+    if aspect is None:
+        aspect = 1.0 * width / height
+    zoom = state['zoom']
+    fx = (2 * numpy.arange(width) + 1) / width - 1
+    fy = (2 * numpy.arange(height) + 1) / height - 1
+    return fx * aspect * zoom + state['pos_x'], fy * zoom + state['pos_y']
+
+
+def view_points(state, width, height, aspect=None):
+    """Complex point of every pixel centre for a mandelbrot.py state dict."""
+    xs, ys = view_axes(state, width, height, aspect)
+    c = numpy.empty((height, width), dtype=numpy.complex128)
+    c.real = xs[numpy.newaxis, :]
+    c.imag = ys[:, numpy.newaxis]
+    return c
+
+
+class EscapeState:
+    """
+    Per-pixel iteration state of one view that can be resumed.
+
+    The escape iteration of every pixel that has escaped is kept as a uint16
+    (uint32 once the limit needs it) together with its float32 smooth-colouring
+    fraction, 6 bytes per pixel.  Pixels that have not escaped are kept in
+    compact arrays of (index, zx, zy) at the highest limit iterated so far, so
+    raising max_iters only continues those pixels, and lowering it only
+    re-thresholds the stored escape iterations.  Iteration follows the fragment
+    shader: iters counts the updates completed before |z|^2 > 4.
+    """
+
+    def __init__(self, c, interior_check=True, periodicity_check=True):
+        self.shape = c.shape
+        c = c.reshape(-1)
+        # Pixels that have not escaped (yet) hold the largest value of the type
+        self.escape_iter = numpy.full(c.size, numpy.iinfo(numpy.uint16).max, dtype=numpy.uint16)
+        self.fraction = numpy.zeros(c.size, dtype=numpy.float32)
+        self.limit = 0  # Iterations completed by every pixel still in the active arrays
+        self.periodicity_check = periodicity_check
+        self.stats = {'interior': 0, 'periodic': 0, 'iterations': 0}
+
+        active = numpy.arange(c.size)
+        if interior_check:
+            x, y = c.real, c.imag
+            y2 = y * y
+            xq = x - 0.25
+            q = xq * xq + y2
+            xb = x + 1.0
+            inside = (q * (q + xq) < 0.25 * y2) | (xb * xb + y2 < 0.0625)
+            self.stats['interior'] = int(inside.sum())
+            active = active[~inside]  # These never escape, at any limit
+        self.active = active
+        self.cx = c.real[active].copy()
+        self.cy = c.imag[active].copy()
+        self.ax = numpy.zeros(active.size)
+        self.ay = numpy.zeros(active.size)
+        # Brent's cycle detection state, shared by all active pixels since they are all at self.limit
+        self.sx = numpy.zeros(active.size)
+        self.sy = numpy.zeros(active.size)
+        self.next_save = 1
+
+    def _keep(self, keep):
+        self.active = self.active[keep]
+        self.cx, self.cy = self.cx[keep], self.cy[keep]
+        self.ax, self.ay = self.ax[keep], self.ay[keep]
+        self.sx, self.sy = self.sx[keep], self.sy[keep]
+
+    def advance(self, max_iters):
+        """Continues the unescaped pixels until every pixel has done max_iters iterations."""
+        max_iters = int(max_iters)
+        not_escaped = numpy.iinfo(self.escape_iter.dtype).max
+        if max_iters >= not_escaped:
+            # Counts are about to outgrow uint16: widen, keeping the not-escaped marker at the top
+            wide = self.escape_iter.astype(numpy.uint32)
+            wide[self.escape_iter == not_escaped] = numpy.iinfo(numpy.uint32).max
+            self.escape_iter = wide
+        while self.limit < max_iters and self.active.size:
+            self.stats['iterations'] += self.active.size
+            zx, zy = self.ax, self.ay
+            zx, zy = zx * zx - zy * zy + self.cx, 2 * zx * zy + self.cy
+            self.ax, self.ay = zx, zy
+            escaped = zx * zx + zy * zy > 4.0
+            if escaped.any():
+                done = self.active[escaped]
+                self.escape_iter[done] = self.limit
+                self.fraction[done] = escape_fraction(zx[escaped], zy[escaped])
+                self._keep(~escaped)
+            self.limit += 1
+
+            if self.periodicity_check:
+                cycled = (self.ax == self.sx) & (self.ay == self.sy)
+                if cycled.any():
+                    self.stats['periodic'] += int(cycled.sum())
+                    self._keep(~cycled)  # An exact repeat never escapes, at any limit
+                if self.limit == self.next_save:
+                    self.sx, self.sy = self.ax.copy(), self.ay.copy()
+                    self.next_save *= 2
+        self.limit = max(self.limit, max_iters)
+
+    def result(self, max_iters):
+        """
+        Returns (iters, fraction) for the given limit, iterating further only
+        if the limit is above anything computed before.  Pixels that did not
+        escape within the limit get iters == max_iters.
+        """
+        max_iters = int(max_iters)
+        self.advance(max_iters)
+        iters = numpy.minimum(self.escape_iter, max_iters).astype(count_dtype(max_iters))
+        return iters.reshape(self.shape), self.fraction.reshape(self.shape)
+
+
+def auto_max_iters(state, aspect, probe=(48, 27), minimum=64, tolerance=0.002, headroom=1.25, info=None):
+    """
+    Picks max_iters for a mandelbrot.py view from a sparse grid of probe pixels.
+
+    The probes are iterated to a ceiling that grows with the zoom depth, and
+    the limit is the smallest one (plus headroom, rounded up to a multiple of
+    32) at which no more than a tolerance fraction of the probes would turn
+    from escaping into interior.  info, if given, receives the limit, the
+    ceiling, the number of probes and the probe cost.
+    """
+    depth = max(0.0, math.log2(1.0 / state['zoom']))
+    ceiling = int(min(65535, 1024 * (1 + depth)))
+    start = time.perf_counter()
+    escape = EscapeState(view_points(state, probe[0], probe[1], aspect))
+    iters = escape.result(ceiling)[0]
+    escaped = numpy.sort(iters[iters < ceiling], axis=None)
+    limit = minimum
+    if escaped.size:
+        allowed = int(tolerance * iters.size)
+        limit = (int(escaped[max(0, escaped.size - 1 - allowed)]) + 1) * headroom
+        limit = max(minimum, min(ceiling, int(math.ceil(limit / 32)) * 32))
+    if info is not None:
+        info.update(limit=limit, ceiling=ceiling, probes=iters.size,
+                    probe_iterations=escape.stats['iterations'], probe_seconds=time.perf_counter() - start)
+    return limit
+
+
+def escape_parts(c, parts=1):
+    """
+    One EscapeState per interleaved part (every parts-th point) of a flat
+    array of points.  Interleaving spreads the expensive points near the set
+    evenly over the parts.
+    """
+    parts = max(1, min(parts, c.size // 2))
+    return [EscapeState(c[k::parts]) for k in range(parts)]
+
+
+def resume_parts(escapes, max_iters, executor=None):
+    """
+    Joins the result(max_iters) of the parts made by escape_parts back into
+    flat (iters, fraction) arrays.  The parts run on the executor's threads;
+    NumPy releases the GIL inside its array operations, so they run in
+    parallel.
+    """
+    parts = len(escapes)
+    size = sum(escape.escape_iter.size for escape in escapes)
+    iters = numpy.empty(size, dtype=count_dtype(max_iters))
+    fraction = numpy.empty(size, dtype=numpy.float32)
+    if executor is None or parts == 1:
+        results = [escape.result(max_iters) for escape in escapes]
+    else:
+        results = [future.result() for future in
+                   [executor.submit(escape.result, max_iters) for escape in escapes]]
+    for k, (part_iters, part_fraction) in enumerate(results):
+        iters[k::parts], fraction[k::parts] = part_iters, part_fraction
+    return iters, fraction
+
+
+def escape_threaded(c, max_iters, executor=None, parts=1):
+    """
+    EscapeState(c).result(max_iters) for a flat array of points, split into
+    interleaved parts that run on the executor's threads.
+    """
+    if executor is None:
+        parts = 1
+    return resume_parts(escape_parts(c, parts), max_iters, executor)
+
+
+def match_axis(new, old, tolerance):
+    """
+    For every coordinate in new, the index of the coordinate in old (sorted
+    ascending) that lies within tolerance of it, or -1 if there is none.
+    """
+    j = numpy.clip(numpy.searchsorted(old, new), 1, len(old) - 1)
+    nearest = numpy.where(numpy.abs(old[j - 1] - new) <= numpy.abs(old[j] - new), j - 1, j)
+    return numpy.where(numpy.abs(old[nearest] - new) <= tolerance, nearest, -1)
+
+
+class FrameReuse:
+    """
+    Renders successive views, reusing the pixels of the previous frame.
+
+    The previous frame's escape iterations are kept with the pixel coordinates
+    they were computed at.  A new frame copies every pixel whose sample point
+    lines up with an old one (within tolerance pixels) and iterates only the
+    rest: after a pan that is just the newly exposed strips, after a zoom the
+    samples that happen to coincide.  Pans are snapped to whole pixels (the
+    view is never more than half a pixel off the requested centre) so the old
+    samples stay aligned.
+
+    While the view itself stays put, the EscapeState of every part of the
+    frame is kept, so raising max_iters only continues the pixels that had
+    not escaped and lowering it only re-thresholds the stored iterations.
+    """
+
+    def __init__(self, tolerance=1e-3, snap=True, executor=None, parts=1):
+        self.tolerance = tolerance
+        self.snap = snap
+        self.executor = executor  # pixels that cannot be reused are iterated in parts on these threads
+        self.parts = parts
+        self.previous = None
+        self.escapes = None  # EscapeState parts covering the whole previous frame, if it was computed in full
+        self.stats = {'reused': 0, 'computed': 0, 'reuse_ratio': 0.0}
+
+    def render(self, state, width, height):
+        """Returns (iters, fraction) for the view, like EscapeState.result."""
+        aspect = 1.0 * width / height
+        max_iters = int(state['max_iters'])
+        state = dict(state)
+        prev = self.previous
+        same_scale = (prev is not None and prev['zoom'] == state['zoom']
+                      and prev['size'] == (width, height))
+        if self.snap and same_scale:
+            spacing_x = 2 * aspect * state['zoom'] / width
+            spacing_y = 2 * state['zoom'] / height
+            state['pos_x'] = prev['pos_x'] + round((state['pos_x'] - prev['pos_x']) / spacing_x) * spacing_x
+            state['pos_y'] = prev['pos_y'] + round((state['pos_y'] - prev['pos_y']) / spacing_y) * spacing_y
+        xs, ys = view_axes(state, width, height, aspect)
+        same_view = (same_scale and self.escapes is not None
+                     and (prev['pos_x'], prev['pos_y']) == (state['pos_x'], state['pos_y']))
+        if same_view:
+            # Only the limit changed: continue (or re-threshold) the kept states
+            computed = sum(escape.active.size for escape in self.escapes if escape.limit < max_iters)
+            iters, fraction = (a.reshape(height, width) for a in
+                               resume_parts(self.escapes, max_iters, self.executor))
+            return self._finish(state, width, height, max_iters, xs, ys, iters, fraction, computed)
+
+        iters = numpy.empty((height, width), dtype=count_dtype(max_iters))
+        fraction = numpy.zeros((height, width), dtype=numpy.float32)
+        missing = numpy.ones((height, width), dtype=bool)
+        if prev is not None and prev['max_iters'] == max_iters and min(width, height) > 1:
+            cols = match_axis(xs, prev['xs'], self.tolerance * (xs[1] - xs[0]))
+            rows = match_axis(ys, prev['ys'], self.tolerance * (ys[1] - ys[0]))
+            new_rows, new_cols = numpy.nonzero(rows >= 0)[0], numpy.nonzero(cols >= 0)[0]
+            if new_rows.size and new_cols.size:
+                dst = numpy.ix_(new_rows, new_cols)
+                src = numpy.ix_(rows[new_rows], cols[new_cols])
+                iters[dst] = prev['iters'][src]
+                fraction[dst] = prev['fraction'][src]
+                missing[dst] = False
+
+        c = numpy.empty((height, width), dtype=numpy.complex128)
+        c.real = xs[numpy.newaxis, :]
+        c.imag = ys[:, numpy.newaxis]
+        computed = int(missing.sum())
+        self.escapes = None
+        if computed:
+            escapes = escape_parts(c[missing], self.parts if self.executor is not None else 1)
+            part_iters, part_fraction = resume_parts(escapes, max_iters, self.executor)
+            iters[missing] = part_iters
+            fraction[missing] = part_fraction
+            if computed == width * height:
+                self.escapes = escapes  # They cover the whole frame, so the view can be resumed
+        return self._finish(state, width, height, max_iters, xs, ys, iters, fraction, computed)
+
+    def _finish(self, state, width, height, max_iters, xs, ys, iters, fraction, computed):
+        """Remembers the frame for the next render and returns it."""
+        self.previous = {'zoom': state['zoom'], 'pos_x': state['pos_x'], 'pos_y': state['pos_y'],
+                         'size': (width, height), 'max_iters': max_iters,
+                         'xs': xs, 'ys': ys, 'iters': iters, 'fraction': fraction}
+        self.stats = {'reused': width * height - computed, 'computed': computed,
+                      'reuse_ratio': 1.0 - computed / (width * height)}
+        return iters, fraction
+
+
+def hsv2rgb(h, s, v):
+    """Vectorized copy of the fragment shader's hsv2rgb for arrays of hue."""
+    k = numpy.array([1.0, 2.0 / 3.0, 1.0 / 3.0], dtype=numpy.float32)
+    x = h[..., numpy.newaxis] + k
+    p = numpy.abs((x - numpy.floor(x)) * 6.0 - 3.0)
+    return v * (1.0 + (numpy.clip(p - 1.0, 0.0, 1.0) - 1.0) * s)
+
+
+# Steps per iteration in the colour tables: the smooth fraction is floored to
+# 1/SHADE_STEPS, which moves the colour by at most 40 / max_iters colour levels
+# of the hue wheel (under one level from 40 iterations up)
+SHADE_STEPS = 16
+
+
+def fraction_rows(iters, fraction, max_iters, periodic=False):
+    """
+    Rows of a fractional-step colour table (see shade_table) for escape
+    iterations and smooth-colouring fractions: row iters * SHADE_STEPS +
+    floor(fraction * SHADE_STEPS) for escaped pixels, row max_iters *
+    SHADE_STEPS (the colour of the set) for the rest.  The fraction of a point
+    that escaped far outside the radius 2 circle is negative and can reach
+    below row 0; with periodic such rows wrap around the table (the colour
+    repeats every max_iters, like the shader's hue), otherwise they are
+    clamped into it.  Returns an int32 array of iters' shape.
+    """
+    top = max_iters * SHADE_STEPS
+    steps = fraction * numpy.float32(SHADE_STEPS)
+    numpy.floor(steps, out=steps)
+    numpy.minimum(steps, SHADE_STEPS - 1, out=steps)  # A fraction can round up to 1.0 in float32
+    rows = iters.astype(numpy.int32)
+    rows *= SHADE_STEPS
+    rows += steps.astype(numpy.int32)
+    if periodic:
+        if rows.min() < 0:  # Only zoomed-out views have points that escape that far
+            numpy.remainder(rows, top, out=rows)
+    else:
+        numpy.clip(rows, 0, top - 1, out=rows)
+    rows[iters >= max_iters] = top
+    return rows
+
+
+@functools.lru_cache(maxsize=8)
+def shade_table(max_iters):
+    """
+    Colour table of the fragment shader's map_color for one limit: row
+    iters * SHADE_STEPS + step holds hsv2rgb of the hue at the middle of that
+    step of the smooth fraction, and the last row (pixels that did not escape)
+    is black.
+    """
+    position = (numpy.arange(max_iters * SHADE_STEPS) + 0.5) / SHADE_STEPS
+    hue = (position / max_iters).astype(numpy.float32)
+    table = numpy.zeros((max_iters * SHADE_STEPS + 1, 3), dtype=numpy.uint8)
+    table[:-1] = numpy.rint(numpy.clip(hsv2rgb(hue, 0.8, 1.0), 0.0, 1.0) * 255)
+    table.setflags(write=False)
+    return table
+
+
+def shade(iters, fraction, max_iters, out=None):
+    """
+    Colours a frame like the fragment shader's map_color: smooth hue
+    (iters + fraction) / max_iters, black for points that did not escape.
+    The hue comes from shade_table, so recolouring is one gather per pixel
+    with no logarithms or hsv2rgb.  Returns a (height, width, 3) uint8 array.
+    """
+    max_iters = int(max_iters)
+    if out is None:
+        out = numpy.empty(iters.shape + (3,), dtype=numpy.uint8)
+    rows = fraction_rows(iters, fraction, max_iters, periodic=True)
+    numpy.take(shade_table(max_iters), rows, axis=0, out=out)
+    return out
+
+
+class CpuRenderer:
+    """
+    Renders mandelbrot.py frames without OpenGL.
+
+    Takes the same state dict as the render loop and reproduces the fragment
+    shader: the transform uniform's pixel mapping (view_axes), its iteration
+    and interior/periodicity shortcuts (EscapeState) and its map_color
+    colouring (shade).  Frames after a pan reuse the previous frame's pixels,
+    and the rest is iterated on a thread pool.
+    """
+
+    def __init__(self, width, height, workers=None):
+        self.width = width
+        self.height = height
+        workers = workers or os.cpu_count() or 1
+        self.executor = ThreadPoolExecutor(workers)
+        self.reuse = FrameReuse(executor=self.executor, parts=4 * workers)
+
+    def render(self, state):
+        """Returns the frame as a (height, width, 3) uint8 array, row 0 at the bottom."""
+        iters, fraction = self.reuse.render(state, self.width, self.height)
+        return shade(iters, fraction, state['max_iters'])
+
+    def close(self):
+        self.executor.shutdown()
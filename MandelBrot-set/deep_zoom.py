@@ -0,0 +1,166 @@
+from decimal import Decimal, localcontext
+import math
+
+import numpy
+
+from cpu_render import count_dtype, escape_fraction
+
+# Relative error against the probe points below which the series approximation is trusted
+SERIES_TOLERANCE = 1e-9
+
+
+def precision_for_zoom(zoom):
+    """Number of decimal digits needed to resolve pixels at the given zoom."""
+    return max(30, int(-math.log10(zoom)) + 20)
+
+
+def reference_orbit(center_x, center_y, max_iters, digits):
+    """
+    Iterates the view centre in arbitrary precision.
+
+    Returns the orbit Z_0 = 0, Z_1, ... rounded to complex128, stopping after
+    max_iters steps or at the first value with |Z|^2 > 4 (which is kept).
+    """
+    with localcontext() as ctx:
+        ctx.prec = digits
+        cx = Decimal(center_x)
+        cy = Decimal(center_y)
+        zx = Decimal(0)
+        zy = Decimal(0)
+        orbit = [0j]
+        for _ in range(max_iters):
+            zx2 = zx * zx
+            zy2 = zy * zy
+            zx, zy = zx2 - zy2 + cx, 2 * zx * zy + cy
+            orbit.append(complex(float(zx), float(zy)))
+            if zx * zx + zy * zy > 4:
+                break
+    return numpy.array(orbit, dtype=numpy.complex128)
+
+
+def series_coefficients(orbit, radius, probes, max_skip):
+    """
+    Finds how many iterations the series approximation can skip.
+
+    The pixel delta after n steps is approximated as a*u + b*u^2 + c*u^3 with
+    u = dc / radius, so |u| <= 1 over the whole view.  The coefficients are
+    kept pre-scaled by powers of radius so they stay finite at deep zooms.
+    The probe offsets (the view's corners and edge midpoints) are iterated
+    exactly alongside, and the approximation is trusted only while it agrees
+    with all of them.  Returns (n, a, b, c) for the last trusted step.
+    """
+    a = b = c = 0j
+    d = numpy.zeros_like(probes)
+    u = probes / radius
+    n = 0
+    best = (0, 0j, 0j, 0j)
+    while n < max_skip:
+        z = orbit[n]
+        a, b, c = 2 * z * a + radius, 2 * z * b + a * a, 2 * z * c + 2 * a * b
+        d = 2 * z * d + d * d + probes
+        n += 1
+        if (numpy.abs(orbit[n] + d) > 2.0).any():
+            break
+        error = numpy.abs(a * u + b * u * u + c * u * u * u - d)
+        if (error > SERIES_TOLERANCE * numpy.abs(d)).any():
+            break
+        best = (n, a, b, c)
+    return best
+
+
+def view_deltas(width, height, zoom, aspect=None):
+    """
+    Offsets of every pixel centre from the view centre, using the same
+    mapping as the fragment shader's transform uniform.
+    """
+    if aspect is None:
+        aspect = 1.0 * width / height
+    fx = (2 * numpy.arange(width) + 1) / width - 1
+    fy = (2 * numpy.arange(height) + 1) / height - 1
+    dc = numpy.empty((height, width), dtype=numpy.complex128)
+    dc.real = (fx * aspect * zoom)[numpy.newaxis, :]
+    dc.imag = (fy * zoom)[:, numpy.newaxis]
+    return dc
+
+
+def render_deep(center_x, center_y, zoom, max_iters, width, height, aspect=None, series=True, stats=None):
+    """
+    Renders a view with perturbation theory.
+
+    center_x/center_y may be strings or Decimals so they keep more digits
+    than a float.  Each pixel iterates only its float64 offset from a single
+    arbitrary-precision reference orbit; pixels are rebased onto the start of
+    the orbit whenever their offset grows larger than the full value (or the
+    reference runs out), which removes perturbation glitches.
+
+    Returns (iters, fraction) with the shader's conventions: iters is the
+    number of completed iterations (max_iters for points that never escape)
+    and fraction the smooth-colouring fraction of the first value that
+    escaped (see cpu_render.escape_fraction), ready for cpu_render.shade.
+    """
+    max_iters = int(max_iters)
+    orbit = reference_orbit(center_x, center_y, max_iters, precision_for_zoom(zoom))
+    last = len(orbit) - 1
+    dc = view_deltas(width, height, zoom, aspect).reshape(-1)
+
+    iters = numpy.full(dc.size, max_iters, dtype=count_dtype(max_iters))
+    fraction = numpy.zeros(dc.size, dtype=numpy.float32)
+
+    # Skip the first iterations of every pixel with the series approximation
+    skip = 0
+    d = numpy.zeros_like(dc)
+    if series and last > 1:
+        radius = float(numpy.abs(dc).max())
+        grid = dc.reshape(height, width)
+        probes = grid[[0, 0, -1, -1, 0, -1, height // 2, height // 2], [0, -1, 0, -1, width // 2, width // 2, 0, -1]]
+        skip, a, b, c = series_coefficients(orbit, radius, probes, min(last - 1, max_iters))
+        if skip:
+            u = dc / radius
+            d = a * u + b * u * u + c * u * u * u
+            # Anything already outside the escape radius may have escaped earlier: iterate it in full
+            z = orbit[skip] + d
+            restart = z.real * z.real + z.imag * z.imag > 4.0
+            d[restart] = 0
+    n = numpy.full(dc.size, skip, dtype=numpy.int64)  # Completed iterations per pixel
+    m = numpy.full(dc.size, skip, dtype=numpy.int64)  # Position of each pixel in the reference orbit
+    if skip:
+        n[restart] = 0
+        m[restart] = 0
+
+    active = numpy.arange(dc.size)
+    rebases = 0
+    while active.size:
+        # d' = 2 Z d + d^2 + dc, so that Z' + d' is the pixel's next value
+        zref = orbit[m]
+        d = 2 * zref * d + d * d + dc[active]
+        m += 1
+        z = orbit[m] + d
+        mag = z.real * z.real + z.imag * z.imag
+
+        escaped = mag > 4.0
+        iters[active[escaped]] = n[escaped]
+        fraction[active[escaped]] = escape_fraction(z.real[escaped], z.imag[escaped])
+        n += 1
+
+        # Rebase onto Z_0 = 0 when the reference stops being a good approximation
+        rebase = ~escaped & ((mag < d.real * d.real + d.imag * d.imag) | (m == last))
+        if rebase.any():
+            d[rebase] = z[rebase]
+            m[rebase] = 0
+            rebases += int(rebase.sum())
+
+        keep = ~escaped & (n < max_iters)
+        active, d, m, n = active[keep], d[keep], m[keep], n[keep]
+
+    if stats is not None:
+        stats['reference_length'] = last
+        stats['series_skip'] = skip
+        stats['rebases'] = rebases
+    shape = (height, width)
+    return iters.reshape(shape), fraction.reshape(shape)
+
+
+def render_state(state, width, height, stats=None):
+    """Renders the view described by a mandelbrot.py state dict."""
+    return render_deep(state['pos_x'], state['pos_y'], state['zoom'], state['max_iters'],
+                       width, height, stats=stats)
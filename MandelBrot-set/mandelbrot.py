@@ -2,6 +2,9 @@ import glfw
 import OpenGL.GL as gl
 import numpy
 
+from cpu_render import CpuRenderer, auto_max_iters
+from telemetry import FrameTelemetry
+
 
 vertex_shader_src = '''
 #version 410 core
@@ -26,6 +29,10 @@ uniform dmat3 transform;
 
 uniform int max_iters = 1000;
 
+// interior short-circuits (results are identical with them on or off)
+uniform bool interior_check = true;
+uniform bool periodicity_check = true;
+
 
 vec3 hsv2rgb(vec3 c)
 {
@@ -43,14 +50,34 @@ vec3 map_color(int i, float r, float c) {
 }
 
 
+bool in_cardioid_or_bulb(double cx, double cy) {
+    double y2 = cy * cy;
+    double xq = cx - 0.25;
+    double q = xq * xq + y2;
+    if (q * (q + xq) < 0.25 * y2) {
+        return true;
+    }
+    double xb = cx + 1.0;
+    return xb * xb + y2 < 0.0625;
+}
+
+
 void main(){
     dvec3 pointCoord = dvec3(fragmentCoord.xy, 1);
     pointCoord *= transform;
     double cx = pointCoord.x;
     double cy = pointCoord.y;
+    if (interior_check && in_cardioid_or_bulb(cx, cy)) {
+        color = vec3(0,0,0);
+        return;
+    }
     int iter = 0;
     double zx = 0;
     double zy = 0;
+    // Brent's cycle detection: compare against an orbit value saved at iterations 1, 2, 4, 8, ...
+    double sx = 0;
+    double sy = 0;
+    int next_save = 1;
     while (iter < max_iters) {
         double nzx = zx * zx - zy * zy + cx;
         double nzy = 2 * zx * zy + cy;
@@ -60,6 +87,17 @@ void main(){
             break;
         }
         iter += 1;
+        if (periodicity_check) {
+            if (zx == sx && zy == sy) {
+                iter = max_iters;
+                break;
+            }
+            if (iter == next_save) {
+                sx = zx;
+                sy = zy;
+                next_save *= 2;
+            }
+        }
     }
     if (iter == max_iters) {
         color = vec3(0,0,0);
@@ -113,28 +151,12 @@ def make_program(shader_list):
     return program
 
 
-def main():
-    if not glfw.init():
-        return
-
-    glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 4)
-    glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 1)
-    glfw.window_hint(glfw.OPENGL_FORWARD_COMPAT, True)
-    glfw.window_hint(glfw.OPENGL_PROFILE, glfw.OPENGL_CORE_PROFILE)
-    glfw.window_hint(glfw.DOUBLEBUFFER, 0)
-    glfw.window_hint(glfw.SAMPLES, 16)
-
-    width = 1920
-    height = 1080
-    aspect = 1.0 * width / height
-
-    window = glfw.create_window(width, height, "Mandelbrot", None, None)
-    if not window:
-        glfw.terminate()
-        return
-
-    glfw.make_context_current(window)
-
+def make_gpu_frame(aspect, telemetry):
+    """
+    Compiles the shaders and sets up the full-screen quad in the current
+    (OpenGL 4.1 core) context.  Returns a function that draws one frame of a
+    state with the fragment shader.
+    """
     # print(f"opengl version: {gl.glGetString(gl.GL_VERSION).decode('ascii')}")
     # print(f"opengl vendor: {gl.glGetString(gl.GL_VENDOR).decode('ascii')}")
     # print(f"opengl renderer: {gl.glGetString(gl.GL_RENDERER).decode('ascii')}")
@@ -178,13 +200,109 @@ def main():
     # gl.glBindBuffer(gl.GL_ARRAY_BUFFER, color_buffer)
     # gl.glVertexAttribPointer(1, 3, gl.GL_FLOAT, gl.GL_FALSE, 0, None)
 
+    def draw(state):
+        with telemetry.phase('upload'):
+            zoom = state['zoom']
+            pos_x = state['pos_x']
+            pos_y = state['pos_y']
+            gl.glUniformMatrix3dv(transform_loc, 1, False,
+                                  numpy.array([aspect * zoom, 0, pos_x, 0, 1 * zoom, pos_y, 0, 0, 1 * zoom], dtype='float64'))
+            gl.glUniform1i(max_iters_loc, int(state['max_iters']))
+
+        with telemetry.phase('draw'):
+            gl.glDrawArrays(gl.GL_TRIANGLES, 0, int(len(vert_values) / 3))
+
+        # glFinish waits for the GPU, so this phase holds the actual shader cost
+        with telemetry.phase('flush'):
+            gl.glFinish()
+
+    return draw
+
+
+def make_cpu_frame(width, height, telemetry):
+    """
+    Returns a function that draws one frame of a state with CpuRenderer,
+    for when no OpenGL 4.1 context is available.  glDrawPixels works in any
+    compatibility context, including software ones.
+    """
+    renderer = CpuRenderer(width, height)
+
+    def draw(state):
+        with telemetry.phase('compute'):
+            pixels = renderer.render(state)
+        with telemetry.phase('draw'):
+            gl.glDrawPixels(width, height, gl.GL_RGB, gl.GL_UNSIGNED_BYTE, pixels)
+        with telemetry.phase('flush'):
+            gl.glFinish()
+
+    return draw
+
+
+def render_headless(state, width, height, path='mandelbrot.ppm'):
+    """Renders one frame on the CPU into a binary PPM file, for machines without a display."""
+    pixels = CpuRenderer(width, height).render(state)
+    with open(path, 'wb') as f:
+        f.write(b'P6 %d %d 255\n' % (width, height))
+        f.write(numpy.flipud(pixels).tobytes())  # image files store the top row first
+    return path
+
+
+def main():
+    width = 1920
+    height = 1080
+    aspect = 1.0 * width / height
+
     state = {
         'zoom': 1,
         'pos_x': -0.7600189058857209,
         'pos_y': 0.0799516080512771,
         'max_iters': 100,
+        'auto_iters': False,  # pick max_iters from a probe grid whenever the view changes
     }
 
+    if not glfw.init():
+        print('No display available, rendered the start view on the CPU to', render_headless(state, width, height))
+        return
+
+    glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 4)
+    glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 1)
+    glfw.window_hint(glfw.OPENGL_FORWARD_COMPAT, True)
+    glfw.window_hint(glfw.OPENGL_PROFILE, glfw.OPENGL_CORE_PROFILE)
+    glfw.window_hint(glfw.DOUBLEBUFFER, 0)
+    glfw.window_hint(glfw.SAMPLES, 16)
+
+    window = glfw.create_window(width, height, "Mandelbrot", None, None)
+    use_gpu = bool(window)
+    if not window:
+        # no OpenGL 4.1 core profile (no dmat3 uniforms): take any context and draw CPU-rendered frames
+        glfw.default_window_hints()
+        glfw.window_hint(glfw.DOUBLEBUFFER, 0)
+        window = glfw.create_window(width, height, "Mandelbrot (CPU)", None, None)
+    if not window:
+        glfw.terminate()
+        print('No OpenGL context available, rendered the start view on the CPU to',
+              render_headless(state, width, height))
+        return
+
+    glfw.make_context_current(window)
+
+    # frame timings are exported on exit and on SIGUSR1 instead of printed every frame
+    if use_gpu:
+        telemetry = FrameTelemetry(('upload', 'draw', 'flush', 'wait'))
+        draw = make_gpu_frame(aspect, telemetry)
+    else:
+        print('OpenGL 4.1 is not available, rendering on the CPU')
+        telemetry = FrameTelemetry(('compute', 'draw', 'flush', 'wait'))
+        draw = make_cpu_frame(width, height, telemetry)
+    telemetry.install('frame_telemetry.json')
+
+    def update_auto_iters():
+        if state['auto_iters']:
+            info = {}
+            state['max_iters'] = auto_max_iters(state, aspect, info=info)
+            print('Auto max_iters: {limit} (probed {probes} points to {ceiling}: {probe_iterations} '
+                  'iterations in {ms:.1f} ms)'.format(ms=info['probe_seconds'] * 1000, **info))
+
     def char_callback(window, char):
         ch = chr(char)
         change = False
@@ -201,7 +319,13 @@ def main():
         elif ch == '[':
             state['max_iters'] *= 0.9
             change = True
+        elif ch == 'a':
+            state['auto_iters'] = not state['auto_iters']
+            print('Auto max_iters:', 'on' if state['auto_iters'] else 'off')
+            change = True
         if change:
+            if ch not in '[]':  # a manual limit stays until the view changes
+                update_auto_iters()
             print('Current zoom:', state['zoom'])
             print('Current max_iters:', state['max_iters'])
 
@@ -221,35 +345,26 @@ def main():
                 state['pos_x'] -= state['zoom'] * 0.02
                 change = True
         if change:
+            update_auto_iters()
             print('Current center:', state['pos_x'], state['pos_y'])
 
 
     glfw.set_char_callback(window, char_callback)
     glfw.set_key_callback(window, key_callback)
-    time_before = glfw.get_time()
 
     print("use +/- to zoom in/out")
     print("use [/] to increase/decrease max_iters")
+    print("use a to toggle automatic max_iters")
     print("use arrows to pan")
 
     while not glfw.window_should_close(window):
-        zoom = state['zoom']
-        pos_x = state['pos_x']
-        pos_y = state['pos_y']
-        gl.glUniformMatrix3dv(transform_loc, 1, False,
-                              numpy.array([aspect * zoom, 0, pos_x, 0, 1 * zoom, pos_y, 0, 0, 1 * zoom], dtype='float64'))
-        gl.glUniform1i(max_iters_loc, int(state['max_iters']))
-
-        gl.glDrawArrays(gl.GL_TRIANGLES, 0, int(len(vert_values) / 3))
-        time = glfw.get_time()
-        print("frame render time", time - time_before)
-        time_before = time
-
-        gl.glFlush()
-
-        glfw.wait_events()
+        with telemetry.frame():
+            draw(state)
+            with telemetry.phase('wait'):
+                glfw.wait_events()
 
     glfw.terminate()
+    print(telemetry.summary())
 
 
 if __name__ == '__main__':
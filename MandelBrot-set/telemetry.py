@@ -0,0 +1,126 @@
+import atexit
+import csv
+import json
+import signal
+import time
+from contextlib import contextmanager
+
+import numpy
+
+
+class FrameTelemetry:
+    """
+    Per-frame timings split into phases, kept in a fixed-size ring buffer.
+
+    Only the last `capacity` frames are kept, so memory stays constant however
+    long the window is open, and percentiles roll with them.  Usage:
+
+        telemetry = FrameTelemetry(('upload', 'draw', 'flush', 'wait'))
+        telemetry.install('frame_times.json')
+        while running:
+            with telemetry.frame():
+                with telemetry.phase('draw'):
+                    ...
+
+    Nothing is printed per frame; the numbers are exported on exit, on
+    SIGUSR1, or whenever export() is called.
+    """
+
+    def __init__(self, phases, capacity=1024):
+        self.phases = tuple(phases)
+        self.capacity = capacity
+        self.times = numpy.zeros((capacity, len(self.phases)))  # seconds per phase
+        self.stamps = numpy.zeros(capacity)  # perf_counter at the start of each frame
+        self.frames = 0  # frames recorded so far, including the ones overwritten
+        self.current = numpy.zeros(len(self.phases))
+        self.frame_start = None
+        self.path = None
+
+    def begin_frame(self):
+        self.current[:] = 0
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        slot = self.frames % self.capacity
+        self.times[slot] = self.current
+        self.stamps[slot] = self.frame_start
+        self.frames += 1
+
+    @contextmanager
+    def frame(self):
+        self.begin_frame()
+        try:
+            yield
+        finally:
+            self.end_frame()
+
+    @contextmanager
+    def phase(self, name):
+        """Adds the time spent in the block to the named phase of the current frame."""
+        index = self.phases.index(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.current[index] += time.perf_counter() - start
+
+    def recorded(self):
+        """Returns (stamps, times) of the frames in the buffer, oldest first."""
+        count = min(self.frames, self.capacity)
+        order = (numpy.arange(count) + self.frames - count) % self.capacity
+        return self.stamps[order], self.times[order]
+
+    def percentiles(self, qs=(50, 95, 99)):
+        """
+        Rolling percentiles in milliseconds over the frames in the buffer, for
+        every phase and for the frame total, as {phase: {'p50': ..., ...}}.
+        """
+        times = self.recorded()[1]
+        columns = dict(zip(self.phases, times.T))
+        columns['total'] = times.sum(axis=1)
+        result = {}
+        for name, values in columns.items():
+            if values.size:
+                result[name] = {'p%d' % q: float(v) * 1000 for q, v in zip(qs, numpy.percentile(values, qs))}
+            else:
+                result[name] = {'p%d' % q: None for q in qs}
+        return result
+
+    def summary(self):
+        """One line per phase with its rolling p50/p95/p99."""
+        lines = ['%d frames (last %d kept)' % (self.frames, min(self.frames, self.capacity))]
+        for name, values in self.percentiles().items():
+            if values['p50'] is not None:
+                lines.append('%-8s p50 %8.3f ms  p95 %8.3f ms  p99 %8.3f ms'
+                             % (name, values['p50'], values['p95'], values['p99']))
+        return '\n'.join(lines)
+
+    def export(self, path=None):
+        """
+        Writes the buffer to path: per-frame rows as CSV if it ends in .csv,
+        otherwise JSON with the percentiles and the per-frame phase times.
+        """
+        path = path or self.path
+        stamps, times = self.recorded()
+        if path.endswith('.csv'):
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(('start',) + self.phases + ('total',))
+                for stamp, row in zip(stamps.tolist(), times.tolist()):
+                    writer.writerow([stamp] + row + [sum(row)])
+        else:
+            with open(path, 'w') as f:
+                json.dump({'frames': self.frames, 'phases': list(self.phases),
+                           'percentiles_ms': self.percentiles(),
+                           'start': stamps.tolist(), 'times': times.tolist()}, f, indent=1)
+        return path
+
+    def install(self, path, signum=getattr(signal, 'SIGUSR1', None)):
+        """
+        Exports to path when the interpreter exits and whenever signum
+        (SIGUSR1 where it exists) is received, without stopping the program.
+        """
+        self.path = path
+        atexit.register(self.export)
+        if signum is not None:
+            signal.signal(signum, lambda *_: self.export())
@@ -0,0 +1,131 @@
+import numpy
+import pytest
+
+from cpu_render import CpuRenderer, EscapeState, FrameReuse, shade, view_points
+
+
+def shader_frame(state, width, height):
+    """
+    The fragment shader of mandelbrot.py emulated pixel for pixel: double
+    precision iteration, then map_color in float32 (hsv2rgb with fract) and
+    the framebuffer's rounding to 8 bits.
+    """
+    c = view_points(state, width, height)
+    max_iters = int(state['max_iters'])
+    zx = numpy.zeros(c.shape)
+    zy = numpy.zeros(c.shape)
+    iters = numpy.full(c.shape, max_iters)
+    running = numpy.ones(c.shape, dtype=bool)
+    for i in range(max_iters):
+        nzx = zx * zx - zy * zy + c.real
+        nzy = 2 * zx * zy + c.imag
+        zx = numpy.where(running, nzx, zx)
+        zy = numpy.where(running, nzy, zy)
+        escaped = running & (zx * zx + zy * zy > 4.0)
+        iters[escaped] = i
+        running &= ~escaped
+    with numpy.errstate(invalid='ignore', divide='ignore'):  # Pixels in the set are painted black below
+        zn = numpy.sqrt((zx * zx).astype(numpy.float32) + (zy * zy).astype(numpy.float32))
+        one = numpy.float32(1)
+        hue = (iters.astype(numpy.float32) + one - numpy.log(numpy.log2(numpy.abs(zn)))) / numpy.float32(max_iters)
+    k = numpy.array([1.0, 2.0 / 3.0, 1.0 / 3.0], dtype=numpy.float32)
+    x = hue[..., numpy.newaxis] + k
+    p = numpy.abs((x - numpy.floor(x)) * numpy.float32(6) - numpy.float32(3))
+    rgb = one + (numpy.clip(p - one, 0, 1) - one) * numpy.float32(0.8)
+    rgb[iters == max_iters] = 0
+    return numpy.rint(numpy.clip(rgb, 0, 1) * 255).astype(numpy.uint8)
+
+
+@pytest.mark.parametrize('zoom', [1, 3, 10])
+@pytest.mark.parametrize('max_iters', [100, 1000])
+def test_shade_matches_shader(zoom, max_iters):
+    state = {'zoom': zoom, 'pos_x': -0.5, 'pos_y': 0.0, 'max_iters': max_iters}
+    width, height = 96, 54
+    iters, fraction = EscapeState(view_points(state, width, height)).result(max_iters)
+    expected = shader_frame(state, width, height)
+    difference = numpy.abs(shade(iters, fraction, max_iters).astype(int) - expected)
+    assert difference.max() <= 1
+
+
+
+def test_cpu_renderer_matches_shader_while_panning():
+    renderer = CpuRenderer(96, 54, workers=2)
+    try:
+        state = {'zoom': 1.0, 'pos_x': -0.5, 'pos_y': 0.0, 'max_iters': 100}
+        for key in ['start', 'right', 'up', 'zoom', 'limit']:
+            if key == 'right':
+                state['pos_x'] += state['zoom'] * 0.02  # The viewer's arrow-key step
+            elif key == 'up':
+                state['pos_y'] += state['zoom'] * 0.02
+            elif key == 'zoom':
+                state['zoom'] *= 0.9
+            elif key == 'limit':
+                state['max_iters'] = 110
+            frame = renderer.render(state)
+            snapped = dict(state, pos_x=renderer.reuse.previous['pos_x'], pos_y=renderer.reuse.previous['pos_y'])
+            difference = numpy.abs(frame.astype(int) - shader_frame(snapped, 96, 54))
+            assert difference.max() <= 1, key
+    finally:
+        renderer.close()
+
+STATE = {'zoom': 0.02, 'pos_x': -0.745, 'pos_y': 0.11, 'max_iters': 300}
+
+
+@pytest.mark.parametrize('limits', [[100, 300], [300, 100], [50, 200, 120, 400]])
+def test_escape_state_resumes_like_a_fresh_state(limits):
+    c = view_points(STATE, 64, 48)
+    escape = EscapeState(c)
+    for max_iters in limits:
+        iters, fraction = escape.result(max_iters)
+        expected_iters, expected_fraction = EscapeState(c).result(max_iters)
+        assert numpy.array_equal(iters, expected_iters)
+        escaped = expected_iters < max_iters
+        assert numpy.array_equal(fraction[escaped], expected_fraction[escaped])
+
+
+def test_escape_state_shortcuts_do_not_change_counts():
+    c = view_points(dict(STATE, zoom=1.0, pos_x=-0.5), 64, 48)
+    plain = EscapeState(c, interior_check=False, periodicity_check=False).result(300)[0]
+    assert numpy.array_equal(EscapeState(c).result(300)[0], plain)
+
+
+def test_escape_state_widens_past_uint16():
+    c = view_points(dict(STATE, zoom=1.0, pos_x=-0.5), 16, 12)
+    escape = EscapeState(c)
+    low = escape.result(200)[0]
+    high = escape.result(70000)[0]
+    assert high.dtype == numpy.uint32
+    assert (high[low < 200] == low[low < 200]).all()
+    assert numpy.array_equal(escape.result(200)[0], low)
+
+
+def fresh(state, width, height):
+    return EscapeState(view_points(state, width, height)).result(state['max_iters'])
+
+
+def test_frame_reuse_pan_matches_fresh_render():
+    width, height = 64, 48
+    spacing = 2 * STATE['zoom'] / height
+    reuse = FrameReuse()
+    state = dict(STATE)
+    for step in range(4):
+        state['pos_x'] += 5 * spacing  # Whole pixels to the side, so the old samples stay aligned
+        state['pos_y'] -= 3 * spacing
+        iters, fraction = reuse.render(state, width, height)
+        snapped = dict(state, pos_x=reuse.previous['pos_x'], pos_y=reuse.previous['pos_y'])
+        expected_iters, expected_fraction = fresh(snapped, width, height)
+        assert numpy.array_equal(iters, expected_iters)
+        # Reused pixels were computed at the old frame's coordinates, which can differ in the last bits
+        assert numpy.allclose(fraction, expected_fraction, atol=1e-4)
+        if step:
+            assert reuse.stats['reuse_ratio'] > 0.8
+
+
+def test_frame_reuse_limit_change_resumes_kept_states():
+    width, height = 64, 48
+    reuse = FrameReuse()
+    reuse.render(dict(STATE, max_iters=100), width, height)
+    for max_iters in [300, 150]:
+        iters, _ = reuse.render(dict(STATE, max_iters=max_iters), width, height)
+        assert numpy.array_equal(iters, fresh(dict(STATE, max_iters=max_iters), width, height)[0])
+    assert reuse.stats['computed'] == 0  # Lowering the limit only re-thresholds
@@ -1,17 +1,64 @@
 # mandelbrot set generation
+import functools
 import sys
+import warnings
 import numpy as np
 from OpenGL.GL import *
 from OpenGL.GLUT import *
 from OpenGL.GLU import *
+from mandelbrot_engine import escape_time, escape_counts, new_shortcut_stats
+from mandelbrot_color import make_palette, apply_palette
+from mandelbrot_tiles import render_parallel, format_cost_histogram
+from mandelbrot_subdivision import escape_counts_subdivided
+from mandelbrot_progressive import progressive_counts
+from mandelbrot_cache import CountCache
+from mandelbrot_autoiter import choose_max_iter
+from mandelbrot_antialias import render_antialiased
+from mandelbrot_histogram import CountHistogram
+from mandelbrot_precision import escape_counts_tiered
+
+from mandelbrot_viewer import load_viewer_module
+
+# The frame telemetry module lives next to mandelbrot.py
+FrameTelemetry = load_viewer_module("telemetry").FrameTelemetry
 
 # Window dimensions
 width, height = 800, 800
 
 # Mandelbrot parameters
 max_iter = 256  # Maximum number of iterations to determine set membership
+auto_iter = False  # Pick max_iter for every view from a sparse probe grid instead of using the fixed value
 xmin, xmax = -2.0, 1.0  # Horizontal bounds of the Mandelbrot set
 ymin, ymax = -1.5, 1.5  # Vertical bounds of the Mandelbrot set
+backend = None  # Escape-time backend ("numba" for the compiled kernel, "numpy" for the batched engine, "python" for
+               # the per-pixel reference); None reads MANDELBROT_BACKEND and otherwise picks the fastest installed
+workers = 1  # Number of render processes (more than 1 renders tiles on a process pool)
+interior_check = True  # Skip points inside the main cardioid and the period-2 bulb
+periodicity_check = True  # Stop iterating points whose orbit cycles
+render_mode = "full"  # "full" iterates every pixel, "subdivide" uses Mariani-Silver rectangle subdivision,
+                      # "progressive" draws coarse-to-fine passes as they complete
+progressive_stride = 16  # Sampling stride of the first progressive pass (1/16 resolution)
+palette = "grayscale"  # Palette used to color escape counts ("grayscale", "hue" or "fire")
+precision_tiers = False  # Iterate in float32, float64 or double-double as the pixel spacing requires
+                         # (float32 is not bit-identical to mandelbrot(); double-double resolves deep zooms)
+deep_view = None  # (centre x, centre y, span x, span y) of a view too deep for float64 bounds to hold apart;
+                  # replaces the bounds when precision_tiers is set
+equalize = False  # Spread the palette evenly over the escape-count distribution of the view
+smooth = False  # Blend neighbouring palette colors with each pixel's smooth-coloring fraction
+                # (full render mode on a single process, without precision tiers)
+antialias = False  # Supersample pixels on the set's boundary (flat regions keep one sample; not in progressive mode)
+antialias_samples = 16  # Sample cap per antialiased pixel
+antialias_cost = 2.0  # Iteration budget of an antialiased frame, relative to a single-sample render
+report_stats = False  # Print the statistics of every computed view (short-circuits, tile costs, coverage, samples)
+
+# Escape counts of recently rendered views, so redisplays of an unchanged view only redraw
+count_cache = CountCache(max_bytes=256 * 1024 * 1024)
+
+# Precision tier of the last tiered render, so only a change of tier is reported
+last_precision_tier = None
+
+# Per-frame phase timings, exported to frame_telemetry.json on exit and on SIGUSR1
+telemetry = FrameTelemetry(("compute", "draw", "flush"))
 
 def mandelbrot(x, y):
     """
@@ -20,19 +67,116 @@ def mandelbrot(x, y):
     :param y: Imaginary part of the complex number.
     :return: Iteration count before the sequence escapes (or max_iter).
     """
-    c = complex(x, y)  # Complex number representing the point
-    z = 0.0j  # Initial value of z (starts at the origin in the complex plane)
-    for i in range(max_iter):
-        if abs(z) > 2.0:  # Escape condition (outside the circle of radius 2)
-            return i
-        z = z * z + c  # Mandelbrot iteration formula
-    return max_iter  # Return max_iter if the sequence does not escape
+    return escape_time(x, y, max_iter)
+
+def cache_key(method):
+    """
+    Describes the current view for the count cache.
+    :param method: "exact" for renders that iterate every pixel, "subdivide" for Mariani-Silver,
+                   "tiered" for renders in the precision tier picked from the pixel spacing (and deep_view),
+                   "fraction" for the smooth-coloring fractions of an "exact" render,
+                   "antialias" for supersampled RGB frames (which also depend on the palette, sample cap and budget).
+    :return: Hashable key.
+    """
+    if method == "antialias":
+        method = (method, palette, antialias_samples, antialias_cost)
+    elif method == "tiered":
+        method = (method, deep_view)
+    return (xmin, xmax, ymin, ymax, width, height, max_iter, method)
+
+def warn_ignored(mode, settings):
+    """
+    Warns about enabled settings that a render mode does not support.
+    :param mode: Name of the render mode, for the message.
+    :param settings: (name, enabled) pairs.
+    """
+    ignored = [name for name, enabled in settings if enabled]
+    if ignored:
+        warnings.warn(f"{mode} ignores {', '.join(ignored)}", stacklevel=2)
+
+@functools.lru_cache(maxsize=256)
+def probe_max_iter(view):
+    """
+    Picks max_iter for a view from a sparse probe grid.
+    The choice is cached per view, so redisplays of an unchanged view do not probe again.
+    :param view: (xmin, xmax, ymin, ymax, width, height).
+    :return: (max_iter, info) where info describes the probe (see choose_max_iter).
+    """
+    view_xmin, view_xmax, view_ymin, view_ymax, view_width, view_height = view
+    info = {}
+    limit = choose_max_iter(np.linspace(view_xmin, view_xmax, view_width),
+                            np.linspace(view_ymin, view_ymax, view_height), backend=backend, info=info)
+    return limit, info
+
+def view_palette(counts):
+    """
+    Builds the palette lookup table for a view.
+    :param counts: Escape counts of the view (their distribution is used when equalize is set).
+    :return: (max_iter + 1, 3) uint8 lookup table.
+    """
+    lut = make_palette(palette, max_iter)
+    if equalize:
+        lut = CountHistogram(max_iter).update(counts).equalized_palette(lut)
+    return lut
 
 def generate_mandelbrot():
     """
     Generates the Mandelbrot set pixel values.
     :return: 3D numpy array representing pixel colors.
     """
+    global last_precision_tier
+    # Create ranges for x and y based on the window dimensions and set bounds
+    x_range = np.linspace(xmin, xmax, width)
+    y_range = np.linspace(ymin, ymax, height)
+
+    # Initialize an empty pixel array (height x width x RGB channels)
+    pixels = np.zeros((height, width, 3), dtype=np.uint8)
+
+    use_smooth = smooth and not precision_tiers and workers == 1
+    if smooth and not use_smooth:
+        warnings.warn("Smooth coloring needs the single-process float64 render; drawing plain counts")
+
+    # Compute the escape time of every point (unless the view is cached), then map escape times to colors
+    key = cache_key("tiered" if precision_tiers else "exact")
+    counts = count_cache.get(key)
+    fraction = count_cache.get(cache_key("fraction")) if use_smooth else None
+    if counts is None or use_smooth and fraction is None:
+        options = {"interior_check": interior_check, "periodicity_check": periodicity_check}
+        if precision_tiers:
+            shortcuts, info = new_shortcut_stats(), {}
+            view = deep_view or ((xmin + xmax) / 2, (ymin + ymax) / 2, xmax - xmin, ymax - ymin)
+            counts = escape_counts_tiered(*view, width, height, max_iter, backend=backend, info=info,
+                                          stats=shortcuts, **options)
+            if info["tier"] != last_precision_tier:
+                downgrade = (f", {info['chosen_tier']} runs on the numpy backend only"
+                             if info["tier"] != info["chosen_tier"] else "")
+                print(f"Precision tier: {info['tier']} (pixel spacing {info['spacing']:.3g}{downgrade})")
+                last_precision_tier = info["tier"]
+        elif workers > 1:
+            counts, stats = render_parallel(x_range, y_range, max_iter, workers=workers, backend=backend, **options)
+            if report_stats:
+                print(format_cost_histogram(stats))  # Report how the render cost was spread over tiles
+            shortcuts = stats["shortcuts"]
+        else:
+            shortcuts = new_shortcut_stats()
+            fraction = np.empty((height, width), dtype=np.float32) if use_smooth else None
+            counts = escape_counts(x_range, y_range, max_iter, backend=backend, fraction=fraction, stats=shortcuts,
+                                   **options)
+            if use_smooth:
+                count_cache.put(cache_key("fraction"), fraction)
+        if report_stats:
+            print("Interior short-circuits:", shortcuts)  # Pixels skipped by each test and iterations saved
+        count_cache.put(key, counts)
+    apply_palette(counts, view_palette(counts), fraction=fraction, out=pixels)
+
+    return pixels
+
+def generate_mandelbrot_subdivided():
+    """
+    Generates the Mandelbrot set pixel values with Mariani-Silver subdivision.
+    Only rectangle borders are iterated; rectangles with a uniform border are filled.
+    :return: 3D numpy array representing pixel colors.
+    """
     # Create ranges for x and y based on the window dimensions and set bounds
     x_range = np.linspace(xmin, xmax, width)
     y_range = np.linspace(ymin, ymax, height)
@@ -40,24 +184,121 @@ def generate_mandelbrot():
     # Initialize an empty pixel array (height x width x RGB channels)
     pixels = np.zeros((height, width, 3), dtype=np.uint8)
 
-    # Iterate over every pixel and compute its color based on Mandelbrot membership
-    for i, y in enumerate(y_range):
-        for j, x in enumerate(x_range):
-            color = mandelbrot(x, y)  # Compute escape time for the point
-            color_value = 255 - int(color * 255 / max_iter)  # Map escape time to grayscale
-            pixels[i, j] = (color_value, color_value, color_value)  # Set RGB color
+    warn_ignored("Subdivision", (("workers", workers > 1), ("precision_tiers", precision_tiers),
+                                 ("smooth", smooth)))
+
+    key = cache_key("subdivide")
+    counts = count_cache.get(key)
+    if counts is None:
+        coverage = {}
+        counts = escape_counts_subdivided(x_range, y_range, max_iter, coverage=coverage, backend=backend,
+                                          interior_check=interior_check, periodicity_check=periodicity_check)
+        if report_stats:
+            print(f"Subdivision iterated {coverage['fraction_iterated']:.1%} of the pixels")
+        count_cache.put(key, counts)
+    apply_palette(counts, view_palette(counts), out=pixels)
+
+    return pixels
+
+def generate_mandelbrot_antialiased():
+    """
+    Generates the Mandelbrot set pixel values with adaptive supersampling.
+    The finished RGB frame is cached like escape counts, so redisplays of an unchanged view only redraw.
+    Supersampling always iterates in float64 on this process and colors with the plain palette.
+    :return: 3D numpy array representing pixel colors.
+    """
+    warn_ignored("Antialiasing", (("equalize", equalize), ("precision_tiers", precision_tiers),
+                                  ("workers", workers > 1), ("render_mode", render_mode != "full"),
+                                  ("smooth", smooth)))
 
+    key = cache_key("antialias")
+    pixels = count_cache.get(key)
+    if pixels is None:
+        stats = {}
+        pixels = render_antialiased(np.linspace(xmin, xmax, width), np.linspace(ymin, ymax, height), max_iter,
+                                    lut=make_palette(palette, max_iter), max_samples=antialias_samples,
+                                    max_cost=antialias_cost, backend=backend, stats=stats,
+                                    interior_check=interior_check, periodicity_check=periodicity_check)
+        if report_stats:
+            print(f"Antialiasing refined {stats['refined']} pixels ({stats['refined_full']} up to the sample cap), "
+                  f"{stats['cost']:.2f} samples per pixel, {stats['iteration_cost']:.2f}x the iterations")
+        count_cache.put(key, pixels)
     return pixels
 
+def draw_mandelbrot_progressive():
+    """
+    Renders the Mandelbrot set in coarse-to-fine passes, drawing each pass as soon as it is ready.
+    Every pass reuses the samples of the coarser passes, so the total work matches one full pass.
+    """
+    # Create ranges for x and y based on the window dimensions and set bounds
+    x_range = np.linspace(xmin, xmax, width)
+    y_range = np.linspace(ymin, ymax, height)
+
+    # Initialize an empty pixel array (height x width x RGB channels)
+    pixels = np.zeros((height, width, 3), dtype=np.uint8)
+
+    warn_ignored("Progressive rendering", (("workers", workers > 1), ("precision_tiers", precision_tiers),
+                                           ("antialias", antialias), ("smooth", smooth)))
+
+    # A cached view is drawn at full resolution straight away
+    key = cache_key("exact")
+    counts = count_cache.get(key)
+    if counts is not None:
+        passes = [(1, counts)]
+    else:
+        passes = progressive_counts(x_range, y_range, max_iter, start_stride=progressive_stride, backend=backend,
+                                    interior_check=interior_check, periodicity_check=periodicity_check)
+    for stride, counts in passes:
+        apply_palette(counts, view_palette(counts), out=pixels)
+        glClear(GL_COLOR_BUFFER_BIT)  # Clear the color buffer
+        glDrawPixels(width, height, GL_RGB, GL_UNSIGNED_BYTE, pixels)  # Draw the upscaled pass
+        glFlush()  # Show this pass before computing the next one
+    count_cache.put(key, counts)
+
 def draw_mandelbrot():
     """
-    Renders the Mandelbrot set onto the OpenGL window.
+    Renders the Mandelbrot set onto the OpenGL window, recording the frame's phase timings.
     """
-    pixels = generate_mandelbrot()  # Generate Mandelbrot set pixel data
+    with telemetry.frame():
+        render_frame()
 
-    glClear(GL_COLOR_BUFFER_BIT)  # Clear the color buffer
-    glDrawPixels(width, height, GL_RGB, GL_UNSIGNED_BYTE, pixels)  # Draw the pixel data
-    glFlush()  # Force execution of OpenGL commands
+def render_frame():
+    """
+    Computes the current view and draws it.
+    """
+    with telemetry.phase("compute"):
+        pixels = compute_frame()
+    if pixels is None:
+        return  # Progressive passes draw themselves
+
+    with telemetry.phase("draw"):
+        glClear(GL_COLOR_BUFFER_BIT)  # Clear the color buffer
+        glDrawPixels(width, height, GL_RGB, GL_UNSIGNED_BYTE, pixels)  # Draw the pixel data
+    with telemetry.phase("flush"):
+        glFinish()  # Force execution of OpenGL commands and wait for them, so the phase holds the real cost
+
+def compute_frame():
+    """
+    Computes the pixels of the current view with the configured render mode.
+    :return: 3D numpy array of pixel colors, or None in progressive mode (which draws every pass itself).
+    """
+    global max_iter
+    if auto_iter:
+        limit, info = probe_max_iter((xmin, xmax, ymin, ymax, width, height))
+        if limit != max_iter:
+            print(f"Auto max_iter {limit} (probed {info['probes']} points to {info['ceiling']}: "
+                  f"{info['probe_iterations']} iterations in {info['probe_seconds'] * 1000:.1f} ms)")
+        max_iter = limit
+    if render_mode == "progressive":
+        draw_mandelbrot_progressive()
+        return None
+    if antialias:
+        pixels = generate_mandelbrot_antialiased()  # Supersample the boundary pixels
+    elif render_mode == "subdivide":
+        pixels = generate_mandelbrot_subdivided()  # Generate pixel data from rectangle borders
+    else:
+        pixels = generate_mandelbrot()  # Generate Mandelbrot set pixel data
+    return pixels
 
 def reshape(w, h):
     """
@@ -84,6 +325,7 @@ def main():
     glClearColor(0.0, 0.0, 0.0, 1.0)  # Set the background color to black
     glutDisplayFunc(draw_mandelbrot)  # Register the display callback function
     glutReshapeFunc(reshape)  # Register the reshape callback function
+    telemetry.install("frame_telemetry.json")  # Export frame timings on exit and on SIGUSR1
 
     glutMainLoop()  # Enter the GLUT event-processing loop
 
@@ -4,13 +4,26 @@ from OpenGL.GL import *
 from OpenGL.GLUT import *
 from OpenGL.GLU import *
 import math
+from koch_geometry import TRIANGLE, KochCache
+from lod import (format_cull_stats, lod_refinements, new_cull_stats, outside_view, pixels_per_unit,
+                 projected_length)
 
 # Window dimensions
 width, height = 800, 800
 
 # Current recursion depth for animation
 current_order = 0
-max_order = 4  # Maximum recursion depth
+max_order = 10  # Maximum recursion depth
+use_vertex_arrays = True  # Draw the NumPy-generated outline with one call (False uses the recursive immediate-mode path)
+geometry_cache = KochCache(max_bytes=256 * 1024 * 1024)  # Outlines of the orders drawn so far, replayed on redraws
+
+# Level of detail
+lod = True  # Stop subdividing segments that are too small to see, and skip the ones off screen
+lod_pixels = 1.0  # Segments shorter than this many pixels on screen are drawn straight
+viewport = (width, height)  # Current viewport size in pixels, updated by reshape
+cull_stats = new_cull_stats()  # Primitive counters of the last frame
+report_cull_stats = True  # Print the counters whenever the order or viewport changes
+last_report = None  # (order, viewport) of the last printed counters
 
 def draw_line(p1, p2):
     """
@@ -24,13 +37,25 @@ def draw_line(p1, p2):
 def koch_snowflake(order, p1, p2):
     """
     Recursively generates the Koch snowflake pattern.
+    With lod set, segments under lod_pixels on screen are drawn straight and segments off screen are skipped.
     :param order: Current recursion depth.
     :param p1: Starting point of the segment.
     :param p2: Ending point of the segment.
     """
+    if lod and order > 0:
+        x1, y1 = p1
+        x2, y2 = p2
+        # The curve stays within half a segment length of the segment's midpoint
+        if outside_view((x1 + x2) / 2, (y1 + y2) / 2, math.hypot(x2 - x1, y2 - y1) / 2):
+            cull_stats["culled_offscreen"] += 4 ** order
+            return
+        if projected_length(x1, y1, x2, y2, pixels_per_unit(*viewport)) < lod_pixels:
+            cull_stats["culled_small"] += 4 ** order - 1
+            order = 0  # Finer detail would not show: draw the segment straight
     if order == 0:
         # Base case: Draw a straight line
         draw_line(p1, p2)
+        cull_stats["drawn"] += 1
     else:
         # Decompose the line segment into three parts
         x1, y1 = p1
@@ -53,17 +78,57 @@ def koch_snowflake(order, p1, p2):
         koch_snowflake(order - 1, p5, p4)
         koch_snowflake(order - 1, p4, p2)
 
+def drawn_order():
+    """
+    Finds the order of the vertex-array outline to draw: the current order or, with lod set, the
+    order at which the triangle's sides have been divided into segments under lod_pixels on screen.
+    The outline lies inside the fixed world window, so no segment of the array is off screen.
+    :return: Order to draw.
+    """
+    if not lod:
+        return current_order
+    (x1, y1), (x2, y2) = TRIANGLE[:2]
+    return lod_refinements(math.hypot(x2 - x1, y2 - y1), 1 / 3, current_order, pixels_per_unit(*viewport),
+                           lod_pixels)
+
+def draw_snowflake_arrays():
+    """
+    Draws the Koch snowflake from the cached vertex array of the current order (see drawn_order).
+    A new order costs one subdivision of the previous one; exposes and reshapes replay the cache.
+    """
+    order = drawn_order()
+    vertices = geometry_cache.vertices(order)  # (3 * 4**order, 2) float32 outline
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glVertexPointer(2, GL_FLOAT, 0, vertices)
+    glDrawArrays(GL_LINE_LOOP, 0, len(vertices))  # One call for the whole outline
+    glDisableClientState(GL_VERTEX_ARRAY)
+    cull_stats["drawn"] = len(vertices)
+    cull_stats["culled_small"] = 3 * 4 ** current_order - len(vertices)
+
+def report():
+    """
+    Prints the primitive counters of the frame just drawn, once per order and viewport.
+    """
+    global last_report
+    if lod and report_cull_stats and last_report != (current_order, viewport):
+        last_report = (current_order, viewport)
+        print(f"order {current_order}: {format_cull_stats(cull_stats)}")
+
 def draw_snowflake():
     """
     Clears the screen and draws the Koch snowflake up to the current recursion depth.
     """
     glClear(GL_COLOR_BUFFER_BIT)
+    cull_stats.update(new_cull_stats())
+    if use_vertex_arrays:
+        draw_snowflake_arrays()
+        glFlush()  # Ensure all drawing commands are executed
+        report()
+        return
     glBegin(GL_LINES)  # Start drawing lines
 
     # Define the initial vertices of the triangle
-    p1 = (-0.5, -0.3)
-    p2 = (0.5, -0.3)
-    p3 = (0.0, 0.6)
+    p1, p2, p3 = TRIANGLE
 
     # Draw each side of the triangle with the Koch snowflake pattern
     koch_snowflake(current_order, p1, p2)
@@ -72,6 +137,7 @@ def draw_snowflake():
 
     glEnd()  # End drawing lines
     glFlush()  # Ensure all drawing commands are executed
+    report()
 
 def animate(value):
     """
@@ -82,6 +148,13 @@ def animate(value):
 
     if current_order < max_order:
         current_order += 1  # Increment the recursion depth
+        if use_vertex_arrays:
+            order = drawn_order()
+            geometry_cache.vertices(order)  # Build the new level now, so the redraw is a replay
+            stats = geometry_cache.stats()
+            print(f"order {order}: {stats['orders'].get(order, 0) / 2**20:.1f} MB, "
+                  f"cache {stats['bytes'] / 2**20:.1f} / {stats['max_bytes'] / 2**20:.0f} MB, "
+                  f"{stats['evictions']} evicted")
         glutPostRedisplay()  # Request to redraw the screen
         glutTimerFunc(1000, animate, 0)  # Set the timer for the next frame
 
@@ -91,6 +164,8 @@ def reshape(w, h):
     :param w: New width of the window.
     :param h: New height of the window.
     """
+    global viewport
+    viewport = (w, h)  # Used by the level-of-detail test
     glViewport(0, 0, w, h)  # Set the viewport to cover the new window
     glMatrixMode(GL_PROJECTION)  # Select the projection matrix
     glLoadIdentity()  # Reset the projection matrix
@@ -5,6 +5,9 @@ from OpenGL.GL import *
 from OpenGL.GLUT import *
 from OpenGL.GLU import *
 import math
+from tree_geometry import RATIO, SPREAD, TRUNK, tree_vertex_count, tree_vertices
+from lod import (format_cull_stats, lod_refinements, new_cull_stats, outside_view, pixels_per_unit,
+                 projected_length)
 
 # Window dimensions
 width, height = 800, 800
@@ -12,14 +15,25 @@ width, height = 800, 800
 # Parameters for fractal tree
 angle = math.pi / 4  # Angle between branches
 branch_length = 0.5  # Initial branch length
-max_recursion_depth = 10  # Maximum number of recursive levels
+max_recursion_depth = 20  # Maximum number of recursive levels (a million branches, drawn from the vertex array)
+use_vertex_arrays = True  # Draw the NumPy-built tree with one call (False uses the recursive immediate-mode path)
+tree_buffer = None  # Vertex array of the tree at max_recursion_depth; smaller depths are a prefix of it
 
 # Current recursion depth (for animation)
 current_depth = 0
 
+# Level of detail
+lod = True  # Stop branching once branches are too small to see, and skip subtrees off screen
+lod_pixels = 1.0  # Branches shorter than this many pixels on screen get no children
+viewport = (width, height)  # Current viewport size in pixels, updated by reshape
+cull_stats = new_cull_stats()  # Primitive counters of the last frame
+report_cull_stats = True  # Print the counters whenever the depth or viewport changes
+last_report = None  # (depth, viewport) of the last printed counters
+
 def draw_branch(x, y, length, angle, depth):
     """
     Recursively draws branches to create a fractal tree.
+    With lod set, branches under lod_pixels on screen get no children and subtrees off screen are skipped.
     :param x: Starting x-coordinate of the branch.
     :param y: Starting y-coordinate of the branch.
     :param length: Length of the current branch.
@@ -28,6 +42,9 @@ def draw_branch(x, y, length, angle, depth):
     """
     if depth == 0:
         return
+    if lod and outside_view(x, y, length / (1 - RATIO)):  # Bound of the branch and all its children
+        cull_stats["culled_offscreen"] += 2 ** depth - 1
+        return
 
     # Calculate the end coordinates of the branch
     x_end = x + length * math.cos(angle)
@@ -38,23 +55,61 @@ def draw_branch(x, y, length, angle, depth):
     glVertex2f(x, y)
     glVertex2f(x_end, y_end)
     glEnd()
+    cull_stats["drawn"] += 1
+
+    if lod and depth > 1 and projected_length(x, y, x_end, y_end, pixels_per_unit(*viewport)) < lod_pixels:
+        cull_stats["culled_small"] += 2 ** depth - 2  # Children would fit inside a few pixels
+        return
 
     # Recursively draw the left and right branches
-    new_length = length * 0.67  # Reduce branch length for each level
-    draw_branch(x_end, y_end, new_length, angle + math.pi / 6, depth - 1)  # Right branch
-    draw_branch(x_end, y_end, new_length, angle - math.pi / 6, depth - 1)  # Left branch
+    new_length = length * RATIO  # Reduce branch length for each level
+    draw_branch(x_end, y_end, new_length, angle + SPREAD, depth - 1)  # Right branch
+    draw_branch(x_end, y_end, new_length, angle - SPREAD, depth - 1)  # Left branch
+
+def draw_tree_arrays():
+    """
+    Draws the tree up to the current depth from the breadth-first vertex array in one call.
+    The array is built once for max_recursion_depth; each animation step only draws a longer prefix.
+    With lod set, the prefix stops after the first level whose branches are under lod_pixels on screen.
+    The whole tree lies inside the fixed world window, so no branch of the array is off screen.
+    """
+    global tree_buffer
+    if tree_buffer is None:
+        tree_buffer = tree_vertices(max_recursion_depth, trunk=(TRUNK[0], branch_length, TRUNK[2]))
+    depth = current_depth
+    if lod and depth > 0:
+        depth = 1 + lod_refinements(branch_length, RATIO, depth - 1, pixels_per_unit(*viewport), lod_pixels)
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glVertexPointer(2, GL_FLOAT, 0, tree_buffer)
+    glDrawArrays(GL_LINES, 0, tree_vertex_count(depth))
+    glDisableClientState(GL_VERTEX_ARRAY)
+    cull_stats["drawn"] = 2 ** depth - 1
+    cull_stats["culled_small"] = 2 ** current_depth - 2 ** depth
+
+def report():
+    """
+    Prints the primitive counters of the frame just drawn, once per depth and viewport.
+    """
+    global last_report
+    if lod and report_cull_stats and last_report != (current_depth, viewport):
+        last_report = (current_depth, viewport)
+        print(f"depth {current_depth}: {format_cull_stats(cull_stats)}")
 
 def draw_tree():
     """
     Clears the screen and draws the fractal tree up to the current recursion depth.
     """
     glClear(GL_COLOR_BUFFER_BIT)  # Clear the color buffer
-
-    # Set initial position and orientation of the trunk
-    start_x, start_y = 0.0, -0.8  # Bottom center of the screen
-    draw_branch(start_x, start_y, branch_length, math.pi / 2, current_depth)  # Start with a vertical trunk
+    cull_stats.update(new_cull_stats())
+    if use_vertex_arrays:
+        draw_tree_arrays()
+    else:
+        # Set initial position and orientation of the trunk
+        (start_x, start_y), _, heading = TRUNK  # Bottom center of the screen, pointing up
+        draw_branch(start_x, start_y, branch_length, heading, current_depth)  # Start with a vertical trunk
 
     glFlush()  # Ensure all drawing commands are executed
+    report()
 
 def animate(value):
     """
@@ -74,6 +129,8 @@ def reshape(w, h):
     :param w: New width of the window.
     :param h: New height of the window.
     """
+    global viewport
+    viewport = (w, h)  # Used by the level-of-detail test
     glViewport(0, 0, w, h)  # Set the viewport to cover the entire window
     glMatrixMode(GL_PROJECTION)  # Select the projection matrix
     glLoadIdentity()  # Reset the projection matrix
@@ -0,0 +1,168 @@
+# koch snowflake geometry (no OpenGL), used by b.py
+import math
+from collections import OrderedDict
+import numpy as np
+
+# Corners of the initial triangle drawn by b.py
+TRIANGLE = ((-0.5, -0.3), (0.5, -0.3), (0.0, 0.6))
+# A segment v is replaced by v/3, v/3 turned by +60 degrees, v/3 turned by -60 degrees and v/3
+TURNS = np.array([1, np.exp(1j * math.pi / 3), np.exp(-1j * math.pi / 3), 1]) / 3
+OFFSETS = np.cumsum(np.concatenate(([0], TURNS[:3])))  # Start of each child along its parent
+
+
+def koch_segments_recursive(order, p1, p2, segments):
+    """
+    Recursively generates the Koch curve between two points (the reference path, same
+    construction as koch_snowflake in b.py).
+    :param order: Current recursion depth.
+    :param p1: Starting point of the segment.
+    :param p2: Ending point of the segment.
+    :param segments: List that receives the (start, end) point pairs in drawing order.
+    """
+    if order == 0:
+        segments.append((p1, p2))
+    else:
+        x1, y1 = p1
+        x2, y2 = p2
+        p3 = ((2 * x1 + x2) / 3, (2 * y1 + y2) / 3)
+        p4 = ((x1 + 2 * x2) / 3, (y1 + 2 * y2) / 3)
+        dx, dy = x2 - x1, y2 - y1
+        angle = math.pi / 3  # 60 degrees in radians
+        p5 = (p3[0] + math.cos(angle) * dx / 3 - math.sin(angle) * dy / 3,
+              p3[1] + math.sin(angle) * dx / 3 + math.cos(angle) * dy / 3)
+        koch_segments_recursive(order - 1, p1, p3, segments)
+        koch_segments_recursive(order - 1, p3, p5, segments)
+        koch_segments_recursive(order - 1, p5, p4, segments)
+        koch_segments_recursive(order - 1, p4, p2, segments)
+
+
+def _subdivide(starts, vectors, levels):
+    """
+    Applies the Koch construction (see TURNS) to segments given as complex start points and vectors.
+    :param starts: 1D complex array of segment start points.
+    :param vectors: 1D complex array of segment vectors (end - start).
+    :param levels: Number of times to subdivide.
+    :return: (starts, vectors) of the 4**levels times as many segments, in drawing order.
+    """
+    for _ in range(levels):
+        starts = (starts[:, np.newaxis] + vectors[:, np.newaxis] * OFFSETS).reshape(-1)
+        vectors = (vectors[:, np.newaxis] * TURNS).reshape(-1)
+    return starts, vectors
+
+
+def _refine_loop(points):
+    """
+    Applies one level of the Koch construction to a closed outline.
+    :param points: 1D complex array of the outline's vertices (each segment runs to the next vertex).
+    :return: 1D complex array of four times as many vertices.
+    """
+    vectors = np.empty_like(points)
+    np.subtract(points[1:], points[:-1], out=vectors[:-1])
+    vectors[-1] = points[0] - points[-1]
+    refined = np.empty((points.size, 4), dtype=points.dtype)  # Written in place: the step is memory-bound
+    np.multiply(vectors[:, np.newaxis], OFFSETS, out=refined)
+    refined += points[:, np.newaxis]
+    return refined.reshape(-1)
+
+
+def koch_vertices(order, corners=TRIANGLE):
+    """
+    Generates the Koch snowflake with NumPy, without recursion.
+    Every segment starts where the previous one ends, so the outline is stored once as the
+    start point of each of its 3 * 4**order segments and drawn as a GL_LINE_LOOP.
+    The construction is split in two: the coarse outline of about half the levels, and the
+    remaining levels of a single unit segment, which is then scaled, turned and moved onto
+    every coarse segment in one broadcast operation.
+    :param order: Recursion depth.
+    :param corners: The three corners of the initial triangle.
+    :return: (3 * 4**order, 2) float32 array of vertices in drawing order.
+    """
+    corners = np.array([complex(x, y) for x, y in corners])
+    coarse_starts, coarse_vectors = _subdivide(corners, np.roll(corners, -1) - corners, order // 2)
+    template = _subdivide(np.zeros(1, dtype=np.complex128), np.ones(1, dtype=np.complex128), order - order // 2)[0]
+    # complex64 is laid out as (x, y) float32 pairs, so the result is already a vertex array
+    vertices = np.empty((len(coarse_starts), len(template)), dtype=np.complex64)
+    np.multiply(coarse_vectors[:, np.newaxis], template.astype(np.complex64), out=vertices)
+    vertices += coarse_starts[:, np.newaxis]
+    return vertices.reshape(-1).view(np.float32).reshape(-1, 2)
+
+
+class KochCache:
+    """
+    Vertex arrays of every Koch snowflake order drawn so far, under a byte budget.
+    Order n is a refinement of order n-1, so the order after the newest one is derived
+    from it in a single subdivision step, and redraws of any cached order are free.
+    Any other order (the first one asked for, or one evicted since) is built with
+    koch_vertices, which is faster than stepping up level by level.
+    Only the newest order also keeps its float64 points (needed for the next step);
+    every other order is just its float32 vertex array.
+    """
+
+    def __init__(self, corners=TRIANGLE, max_bytes=256 * 1024 * 1024):
+        """
+        :param corners: The three corners of the initial triangle.
+        :param max_bytes: Total size of the cached arrays above which the least recently used orders are evicted.
+        """
+        self.corners = corners
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # Order -> float32 vertices, least recently used first
+        self.tip = None  # (order, complex128 points) of the newest order built
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _tip_bytes(self):
+        return self.tip[1].nbytes if self.tip is not None else 0
+
+    def bytes(self):
+        """
+        :return: Total size of the cached arrays, including the float64 points of the newest order.
+        """
+        return sum(vertices.nbytes for vertices in self.entries.values()) + self._tip_bytes()
+
+    def vertices(self, order):
+        """
+        Returns the snowflake of one order, deriving it from the previous order when that is the newest built.
+        :param order: Recursion depth.
+        :return: (3 * 4**order, 2) float32 array of vertices in drawing order (read-only).
+        """
+        vertices = self.entries.get(order)
+        if vertices is not None:
+            self.entries.move_to_end(order)
+            self.hits += 1
+            return vertices
+        self.misses += 1
+        newest = self.tip[0] if self.tip is not None else None
+        keep = 24 * 3 * 4 ** order <= self.max_bytes  # Float32 vertices and float64 points fit in the budget
+        if newest is not None and (order == newest or order == newest + 1 and keep):
+            points = self.tip[1] if order == newest else _refine_loop(self.tip[1])  # One new level
+            vertices = points.astype(np.complex64).view(np.float32).reshape(-1, 2)
+        else:
+            vertices = koch_vertices(order, self.corners)
+            points = vertices.reshape(-1).view(np.complex64).astype(np.complex128) if keep else None
+        vertices.setflags(write=False)
+        if newest is None or order > newest:
+            self.tip = (order, points) if points is not None else None
+        self._put(order, vertices)
+        return vertices
+
+    def _put(self, order, vertices):
+        """
+        Stores a vertex array, evicting the least recently used orders to stay within the budget.
+        If the array and the newest order's points do not fit even in an empty cache, neither is kept.
+        """
+        while self.entries and self.bytes() + vertices.nbytes > self.max_bytes:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        if self.bytes() + vertices.nbytes > self.max_bytes:
+            self.tip = None  # Too large to keep: the next order is built from scratch
+            return
+        self.entries[order] = vertices
+
+    def stats(self):
+        """
+        :return: Dictionary with hit/miss/eviction counters, the bytes of every cached order and total usage.
+        """
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "orders": {order: vertices.nbytes for order, vertices in sorted(self.entries.items())},
+                "bytes": self.bytes(), "max_bytes": self.max_bytes}
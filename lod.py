@@ -0,0 +1,78 @@
+# level-of-detail helpers for the recursive geometry fractals (b.py, c.py), no OpenGL
+import math
+
+# World window set by gluOrtho2D in the reshape callbacks: (left, right, bottom, top)
+ORTHO = (-1.0, 1.0, -1.0, 1.0)
+
+
+def pixels_per_unit(viewport_width, viewport_height, ortho=ORTHO):
+    """
+    Finds how many pixels one world unit covers through gluOrtho2D and glViewport.
+    :param viewport_width: Viewport width in pixels.
+    :param viewport_height: Viewport height in pixels.
+    :param ortho: World window (left, right, bottom, top).
+    :return: (pixels per unit along x, pixels per unit along y).
+    """
+    left, right, bottom, top = ortho
+    return viewport_width / (right - left), viewport_height / (top - bottom)
+
+
+def projected_length(x1, y1, x2, y2, scale):
+    """
+    Measures a segment on screen.
+    :param x1, y1: Starting point in world coordinates.
+    :param x2, y2: Ending point in world coordinates.
+    :param scale: (pixels per unit along x, pixels per unit along y), see pixels_per_unit.
+    :return: Length of the projected segment in pixels.
+    """
+    return math.hypot((x2 - x1) * scale[0], (y2 - y1) * scale[1])
+
+
+def outside_view(x, y, radius, ortho=ORTHO):
+    """
+    Tests whether everything within radius of (x, y) is off screen.
+    :param x, y: Centre of the bounding circle in world coordinates.
+    :param radius: Radius of the bounding circle.
+    :param ortho: World window (left, right, bottom, top).
+    :return: True if the circle's bounding box misses the world window.
+    """
+    left, right, bottom, top = ortho
+    return x + radius < left or x - radius > right or y + radius < bottom or y - radius > top
+
+
+def lod_refinements(length, ratio, refinements, scale, min_pixels):
+    """
+    Finds how many times to refine a self-similar figure whose primitives all have the same length
+    at each level, as in the vertex arrays of b.py and c.py. Like the recursive drawers, a primitive
+    is only refined while it is at least min_pixels long on screen. Lengths are measured along the
+    axis that magnifies most, so a level is only dropped when no primitive before it reaches min_pixels.
+    :param length: Length of the primitives before any refinement, in world units.
+    :param ratio: Length of a refined primitive relative to its parent.
+    :param refinements: Number of refinements asked for.
+    :param scale: (pixels per unit along x, pixels per unit along y), see pixels_per_unit.
+    :param min_pixels: Shortest primitive on screen that is still refined.
+    :return: Number of refinements to draw (at most refinements).
+    """
+    count = 0
+    while count < refinements and length * max(scale) >= min_pixels:
+        length *= ratio
+        count += 1
+    return count
+
+
+def new_cull_stats():
+    """
+    :return: Dictionary of primitive counters for one frame: drawn, culled by size (sub-pixel
+             refinements not drawn) and culled off screen.
+    """
+    return {"drawn": 0, "culled_small": 0, "culled_offscreen": 0}
+
+
+def format_cull_stats(stats):
+    """
+    :return: One line summary of a frame's counters (see new_cull_stats).
+    """
+    culled = stats["culled_small"] + stats["culled_offscreen"]
+    total = stats["drawn"] + culled
+    return (f"{stats['drawn']} drawn, {culled} culled ({stats['culled_small']} sub-pixel, "
+            f"{stats['culled_offscreen']} off screen) of {total} primitives")
@@ -0,0 +1,139 @@
+# adaptive supersampling for mandelbrot renders
+import math
+import numpy as np
+from mandelbrot_engine import escape_counts, escape_counts_flat, new_shortcut_stats
+from mandelbrot_color import apply_palette, grayscale_palette
+
+
+def _local_variance(values):
+    """
+    Computes the variance of every pixel and its four edge neighbours (edges are padded by repetition).
+    A pixel next to an edge in the image sees the other side of it; pixels one further away do not.
+    :param values: 2D float array.
+    :return: 2D float array of the same shape.
+    """
+    padded = np.pad(values, 1, mode="edge")
+    height, width = values.shape
+    windows = [padded[r:r + height, c:c + width] for r, c in ((1, 1), (0, 1), (2, 1), (1, 0), (1, 2))]
+    mean = sum(windows) / 5
+    return sum(w * w for w in windows) / 5 - mean * mean
+
+
+def _stratified_offsets(pixels, side, rng):
+    """
+    Places side x side jittered samples in every pixel, one in each cell of a side x side grid.
+    :param pixels: Number of pixels.
+    :param side: Number of strata along each axis.
+    :param rng: numpy.random.Generator.
+    :return: (dx, dy) arrays of shape (pixels, side * side) with offsets in pixels from the centre.
+    """
+    cells = np.arange(side * side)
+    dx = ((cells % side) + rng.random((pixels, side * side))) / side - 0.5
+    dy = ((cells // side) + rng.random((pixels, side * side))) / side - 0.5
+    return dx, dy
+
+
+def _within_budget(indices, cost, budget):
+    """
+    Keeps the leading entries of a priority-ordered list whose total estimated cost fits a budget.
+    :param indices: 1D array of pixel indices, most important first.
+    :param cost: Estimated cost of each entry.
+    :param budget: Total cost allowed.
+    :return: The kept prefix of indices.
+    """
+    return indices[:np.searchsorted(np.cumsum(cost), budget, side="right")]
+
+
+def render_antialiased(x_range, y_range, max_iter, lut=None, max_samples=16, threshold=6.0, max_cost=2.0, seed=0,
+                       backend=None, stats=None, **options):
+    """
+    Renders an RGB image with adaptive supersampling.
+    Every pixel gets one sample at its centre first; only pixels whose brightness varies from
+    their edge neighbours by more than threshold get jittered samples, first a 2x2 grid and then,
+    where those samples still disagree, a larger grid up to max_samples. Flat interior and exterior
+    regions stay at one sample. Samples near the set cost far more iterations than the average
+    pixel, so the rounds are also held to an iteration budget of max_cost times the single-sample
+    render: the pixels that vary most are refined first, and the rest keep fewer samples.
+    :param x_range: 1D array of real parts (one per column).
+    :param y_range: 1D array of imaginary parts (one per row).
+    :param max_iter: Maximum number of iterations.
+    :param lut: (max_iter + 1, 3) uint8 palette (defaults to the a.py grayscale palette).
+    :param max_samples: Sample cap per pixel, centre sample included; each round adds the largest
+                        square grid (2x2 at most in the first) that keeps a pixel within it.
+    :param threshold: Brightness standard deviation (0-255 scale) above which a pixel is refined.
+    :param max_cost: Iterations of the whole render relative to the single-sample render.
+    :param seed: Seed of the jitter, so the same view always gives the same image.
+    :param backend: Escape-time backend (see resolve_backend).
+    :param stats: Optional dictionary that receives pixels, refined, refined_full, samples, cost
+                  (samples per pixel) and iteration_cost (iterations relative to a single-sample render).
+    :param options: Options for the escape-time kernel (interior_check, periodicity_check).
+    :return: 3D uint8 array of pixel colors.
+    """
+    if lut is None:
+        lut = grayscale_palette(max_iter)
+    x_range = np.asarray(x_range, dtype=np.float64)
+    y_range = np.asarray(y_range, dtype=np.float64)
+    height, width = len(y_range), len(x_range)
+    step_x = (x_range[-1] - x_range[0]) / max(1, width - 1)  # Pixel spacing in the complex plane
+    step_y = (y_range[-1] - y_range[0]) / max(1, height - 1)
+    rng = np.random.default_rng(seed)
+
+    work = new_shortcut_stats()  # Iterations done, the measure of the budget
+    counts = escape_counts(x_range, y_range, max_iter, backend=backend, stats=work, **options)
+    base = max(1, work["iterations"])
+    budget = (max_cost - 1) * base
+    pixels = apply_palette(counts, lut)
+    counts = counts.reshape(-1)
+    brightness = lut.mean(axis=1, dtype=np.float32)[counts]
+    variance = _local_variance(brightness.reshape(height, width)).reshape(-1)
+    candidates = np.flatnonzero(variance > threshold * threshold)
+    candidates = candidates[np.argsort(variance[candidates], kind="stable")[::-1]]  # Most varied first
+    samples = height * width
+
+    def supersample(indices, side):
+        """Renders side x side jittered samples in each pixel; returns their colors and counts per pixel."""
+        rows, cols = np.divmod(indices, width)
+        dx, dy = _stratified_offsets(indices.size, side, rng)
+        c = np.empty(dx.shape, dtype=np.complex128)
+        c.real = x_range[cols][:, np.newaxis] + dx * step_x
+        c.imag = y_range[rows][:, np.newaxis] + dy * step_y
+        sample_counts = escape_counts_flat(c.reshape(-1), max_iter, backend=backend, stats=work, **options)
+        sample_counts = sample_counts.reshape(indices.size, side * side)
+        return lut[sample_counts].astype(np.float32), sample_counts
+
+    # Every pixel already has its centre sample; the rounds add side x side grids within the cap
+    first_side = min(2, math.isqrt(max(0, max_samples - 1)))
+    rest = math.isqrt(max(0, max_samples - 1 - first_side * first_side))  # Side of the second round's grid
+    refined_full = np.empty(0, dtype=np.intp)
+    if first_side == 0:
+        candidates = refined_full  # A cap of one sample leaves nothing to refine
+    # A sample is estimated to cost as many iterations as the pixel's centre took (at least one)
+    candidates = _within_budget(candidates, first_side * first_side * np.maximum(counts[candidates], 1), budget)
+    colors = pixels.reshape(-1, 3)  # Refined pixels are averaged in float and written back
+    if candidates.size:
+        first, first_counts = supersample(candidates, first_side)
+        total = lut[counts[candidates]] + first.sum(axis=1)  # Centre sample plus the jittered ones
+        taken = 1 + first_side * first_side
+        colors[candidates] = np.rint(total / taken)
+        samples += candidates.size * first_side * first_side
+        if rest >= 2:
+            # Pixels whose samples still disagree get the rest of the sample budget, most varied first
+            spread = np.concatenate((brightness[candidates][:, np.newaxis], first.mean(axis=2)), axis=1).std(axis=1)
+            disagree = np.flatnonzero(spread > threshold)
+            disagree = disagree[np.argsort(spread[disagree], kind="stable")[::-1]]
+            disagree = _within_budget(disagree, rest * rest * np.maximum(first_counts[disagree].mean(axis=1), 1),
+                                      (max_cost - 1) * base - (work["iterations"] - base))
+            refined_full = candidates[disagree]
+            if refined_full.size:
+                more = supersample(refined_full, rest)[0]
+                colors[refined_full] = np.rint((total[disagree] + more.sum(axis=1)) / (taken + rest * rest))
+                samples += refined_full.size * rest * rest
+
+    if stats is not None:
+        stats["pixels"] = height * width
+        stats["refined"] = int(candidates.size)
+        stats["refined_full"] = int(refined_full.size)
+        stats["samples"] = int(samples)
+        stats["cost"] = samples / max(1, height * width)
+        stats["iteration_cost"] = work["iterations"] / base
+    return pixels
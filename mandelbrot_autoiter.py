@@ -0,0 +1,79 @@
+# automatic iteration limit for a mandelbrot view
+import math
+import time
+import numpy as np
+from mandelbrot_engine import escape_counts, new_shortcut_stats
+
+# Width of the full a.py view, used to measure how deep a view is zoomed
+FULL_SPAN = 3.0
+# Largest limit ever probed; it also keeps counts in the compact uint16 buffers
+MAX_CEILING = 65535
+
+
+def probe_ceiling(span, base=1024):
+    """
+    Picks the limit the probe grid is iterated to; deeper views need more iterations to resolve.
+    :param span: Width (or height) of the view in the complex plane.
+    :param base: Ceiling for the full view.
+    :return: Iteration ceiling.
+    """
+    depth = max(0.0, math.log2(FULL_SPAN / span)) if span > 0 else 0.0
+    return int(min(MAX_CEILING, base * (1 + depth)))
+
+
+def pick_limit(counts, ceiling, minimum=64, tolerance=0.002, headroom=1.25, step=32):
+    """
+    Picks the smallest iteration limit under which the probes keep their classification.
+    Probes that escape late are the boundary detail; the limit is chosen so that at most
+    a tolerance fraction of all probes would be drawn as interior when they actually escape.
+    :param counts: Escape counts of the probes, iterated up to ceiling.
+    :param ceiling: Limit the probes were iterated to.
+    :param minimum: Smallest limit returned.
+    :param tolerance: Fraction of probes allowed to change from escaping to interior.
+    :param headroom: Factor applied to the limit to cover detail between the probes.
+    :param step: The limit is rounded up to a multiple of this, so small view changes keep the same limit.
+    :return: Iteration limit.
+    """
+    escaped = np.sort(counts[counts < ceiling], axis=None)
+    if escaped.size == 0:
+        return min(minimum, ceiling)  # Nothing escapes (or nothing was probed): the limit does not matter
+    allowed = int(tolerance * counts.size)
+    limit = (int(escaped[max(0, escaped.size - 1 - allowed)]) + 1) * headroom
+    limit = int(math.ceil(limit / step)) * step
+    return max(minimum, min(ceiling, limit))
+
+
+def choose_max_iter(x_range, y_range, probe_size=32, minimum=64, ceiling=None, tolerance=0.002, backend=None,
+                    info=None):
+    """
+    Chooses max_iter for a view from a sparse grid of probe pixels.
+    :param x_range: 1D array of real parts of the view (one per column).
+    :param y_range: 1D array of imaginary parts of the view (one per row).
+    :param probe_size: Number of probe rows and columns.
+    :param minimum: Smallest limit returned.
+    :param ceiling: Limit the probes are iterated to (defaults to probe_ceiling of the view).
+    :param tolerance: Fraction of probes allowed to change from escaping to interior (see pick_limit).
+    :param backend: Escape-time backend for the probes.
+    :param info: Optional dictionary that receives limit, ceiling, probes, probe_iterations and probe_seconds.
+    :return: Iteration limit.
+    """
+    x_range = np.asarray(x_range, dtype=np.float64)
+    y_range = np.asarray(y_range, dtype=np.float64)
+    if ceiling is None:
+        span = min(abs(x_range[-1] - x_range[0]), abs(y_range[-1] - y_range[0]))
+        ceiling = probe_ceiling(span)
+    # Probes sit on actual pixel centres so they see what the render will see
+    cols = np.unique(np.linspace(0, len(x_range) - 1, probe_size).round().astype(int))
+    rows = np.unique(np.linspace(0, len(y_range) - 1, probe_size).round().astype(int))
+    stats = new_shortcut_stats()
+    start = time.perf_counter()
+    counts = escape_counts(x_range[cols], y_range[rows], ceiling, backend=backend, stats=stats)
+    elapsed = time.perf_counter() - start
+    limit = pick_limit(counts, ceiling, minimum, tolerance)
+    if info is not None:
+        info["limit"] = limit
+        info["ceiling"] = ceiling
+        info["probes"] = counts.size
+        info["probe_iterations"] = stats["iterations"]
+        info["probe_seconds"] = elapsed
+    return limit
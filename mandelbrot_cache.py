@@ -0,0 +1,69 @@
+# in-memory cache of mandelbrot escape-count arrays
+from collections import OrderedDict
+
+
+class CountCache:
+    """
+    LRU cache of escape-count arrays under a byte budget.
+    Keys describe the view (bounds, resolution, iteration limit, ...); values are the
+    count arrays, stored read-only so callers cannot modify a cached frame by accident.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        """
+        :param max_bytes: Total size of the cached arrays above which the least recently used are evicted.
+        """
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # Least recently used first
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Looks up a count array and marks it as most recently used.
+        :param key: Hashable view description.
+        :return: The cached array, or None on a miss.
+        """
+        counts = self.entries.get(key)
+        if counts is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return counts
+
+    def put(self, key, counts):
+        """
+        Stores a count array, evicting the least recently used entries to stay within the budget.
+        Arrays larger than the whole budget are not cached.
+        :param key: Hashable view description.
+        :param counts: Escape-count array.
+        """
+        if key in self.entries:
+            self.bytes -= self.entries.pop(key).nbytes
+        if counts.nbytes > self.max_bytes:
+            return
+        while self.entries and self.bytes + counts.nbytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= evicted.nbytes
+            self.evictions += 1
+        counts = counts.copy() if counts.flags.writeable else counts
+        counts.setflags(write=False)
+        self.entries[key] = counts
+        self.bytes += counts.nbytes
+
+    def clear(self):
+        """
+        Drops every cached array (the counters are kept).
+        """
+        self.entries.clear()
+        self.bytes = 0
+
+    def stats(self):
+        """
+        :return: Dictionary with hit/miss/eviction counters and current usage.
+        """
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": len(self.entries), "bytes": self.bytes, "max_bytes": self.max_bytes}
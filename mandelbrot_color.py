@@ -0,0 +1,109 @@
+# palette lookup tables for coloring escape counts
+import numpy as np
+from mandelbrot_viewer import load_viewer_module
+
+# Smooth coloring uses the fractional-step tables of the shader-view CPU renderer
+cpu_render = load_viewer_module("cpu_render")
+
+
+def grayscale_palette(max_iter):
+    """
+    Builds the grayscale palette used by a.py (255 for fast escape, 0 inside the set).
+    :param max_iter: Maximum number of iterations.
+    :return: (max_iter + 1, 3) uint8 lookup table indexed by escape count.
+    """
+    # Integer floor division matches 255 - int(color * 255 / max_iter) exactly
+    level = (255 - np.arange(max_iter + 1, dtype=np.int64) * 255 // max_iter).astype(np.uint8)
+    return np.repeat(level[:, np.newaxis], 3, axis=1)
+
+
+def hue_palette(max_iter, saturation=0.8, cycles=1.0):
+    """
+    Builds a palette that sweeps the hue wheel, like the fragment shader in MandelBrot-set.
+    :param max_iter: Maximum number of iterations.
+    :param saturation: HSV saturation of every entry.
+    :param cycles: Number of trips around the hue wheel between 0 and max_iter.
+    :return: (max_iter + 1, 3) uint8 lookup table indexed by escape count; the last entry is black.
+    """
+    hue = np.arange(max_iter + 1) * cycles / max(1, max_iter)
+    p = np.abs(((hue[:, np.newaxis] + [1.0, 2.0 / 3.0, 1.0 / 3.0]) % 1.0) * 6.0 - 3.0)
+    rgb = 1.0 + (np.clip(p - 1.0, 0.0, 1.0) - 1.0) * saturation
+    lut = np.rint(rgb * 255).astype(np.uint8)
+    lut[max_iter] = 0  # Points inside the set
+    return lut
+
+
+def fire_palette(max_iter):
+    """
+    Builds a black-red-yellow-white palette.
+    :param max_iter: Maximum number of iterations.
+    :return: (max_iter + 1, 3) uint8 lookup table indexed by escape count; the last entry is black.
+    """
+    t = np.sqrt(np.arange(max_iter + 1) / max(1, max_iter))  # Spend more of the ramp on low counts
+    rgb = np.clip(np.stack((3 * t, 3 * t - 1, 3 * t - 2), axis=1), 0.0, 1.0)
+    lut = np.rint(rgb * 255).astype(np.uint8)
+    lut[max_iter] = 0  # Points inside the set
+    return lut
+
+
+# Available palettes, keyed by name
+PALETTES = {
+    "grayscale": grayscale_palette,
+    "hue": hue_palette,
+    "fire": fire_palette,
+}
+
+
+def make_palette(name, max_iter):
+    """
+    Builds a palette lookup table by name.
+    :param name: Name of the palette in PALETTES.
+    :param max_iter: Maximum number of iterations.
+    :return: (max_iter + 1, 3) uint8 lookup table.
+    """
+    if name not in PALETTES:
+        raise ValueError(f"Unknown palette: {name!r} (available: {', '.join(PALETTES)})")
+    return PALETTES[name](max_iter)
+
+
+def smooth_palette(lut):
+    """
+    Expands a palette into a fractional-step table for smooth coloring, laid out like
+    cpu_render.shade_table: row count * SHADE_STEPS + step blends lut[count] towards
+    lut[count + 1] by the middle of that step, and the last row is the color of the set.
+    Escaped points stay below the last count, so blending never pulls in the color of the set.
+    :param lut: (n, 3) uint8 lookup table indexed by escape count.
+    :return: ((n - 1) * SHADE_STEPS + 1, 3) uint8 table.
+    """
+    steps = cpu_render.SHADE_STEPS
+    top = len(lut) - 1  # Count of points that never escaped
+    low = lut[:top].astype(np.float32)
+    high = lut[np.minimum(np.arange(1, top + 1), max(0, top - 1))].astype(np.float32)
+    weight = ((np.arange(steps, dtype=np.float32) + 0.5) / steps)[:, np.newaxis]
+    table = np.empty((top * steps + 1, 3), dtype=np.uint8)
+    table[:-1] = np.rint(low[:, np.newaxis] * (1 - weight) + high[:, np.newaxis] * weight).reshape(-1, 3)
+    table[-1] = lut[top]
+    return table
+
+
+def apply_palette(counts, lut, fraction=None, out=None):
+    """
+    Colors escape counts with a palette lookup table.
+    This is a single gather per pixel, so a view can be recolored with a different
+    palette without iterating it again; with fraction the gather goes through the
+    palette's fractional-step table (see smooth_palette) instead of the palette itself.
+    :param counts: Integer array of escape counts (at most len(lut) - 1).
+    :param lut: (n, 3) uint8 lookup table indexed by escape count.
+    :param fraction: Optional float32 array of smooth-coloring fractions (see escape_counts_points);
+                     each escaped pixel then takes a color between lut[count] and its neighbour.
+    :param out: Optional uint8 array of shape counts.shape + (3,) to fill.
+    :return: uint8 array of pixel colors.
+    """
+    if out is None:
+        out = np.empty(counts.shape + (3,), dtype=np.uint8)
+    if fraction is None:
+        np.take(lut, counts, axis=0, out=out)
+        return out
+    rows = cpu_render.fraction_rows(counts, np.asarray(fraction, dtype=np.float32), len(lut) - 1)
+    np.take(smooth_palette(lut), rows, axis=0, out=out)
+    return out
@@ -0,0 +1,372 @@
+# mandelbrot escape-time engine
+import math
+import os
+import warnings
+import numpy as np
+from mandelbrot_color import apply_palette, grayscale_palette
+
+try:  # The compiled backend is optional
+    from mandelbrot_jit import escape_points, escape_rows, set_num_threads
+except ImportError:
+    escape_points = escape_rows = set_num_threads = None
+
+# Environment variable that selects the backend when none is given explicitly
+BACKEND_ENV = "MANDELBROT_BACKEND"
+
+
+def escape_time(x, y, max_iter):
+    """
+    Determines the escape time for a given point in the complex plane.
+    This is the per-pixel reference path; every other backend must match it exactly.
+    :param x: Real part of the complex number.
+    :param y: Imaginary part of the complex number.
+    :param max_iter: Maximum number of iterations.
+    :return: Iteration count before the sequence escapes (or max_iter).
+    """
+    return escape_orbit(x, y, max_iter)[0]
+
+
+def escape_orbit(x, y, max_iter):
+    """
+    Iterates a point like escape_time and also returns where its orbit ended.
+    :param x: Real part of the complex number.
+    :param y: Imaginary part of the complex number.
+    :param max_iter: Maximum number of iterations.
+    :return: (count, z) where z is the first value outside the circle of radius 2 (or the last one computed).
+    """
+    c = complex(x, y)  # Complex number representing the point
+    z = 0.0j  # Initial value of z (starts at the origin in the complex plane)
+    for i in range(max_iter):
+        if abs(z) > 2.0:  # Escape condition (outside the circle of radius 2)
+            return i, z
+        z = z * z + c  # Mandelbrot iteration formula
+    return max_iter, z  # Return max_iter if the sequence does not escape
+
+
+def complex_grid(x_range, y_range):
+    """
+    Builds the grid of complex points c = x + iy for every pixel.
+    :param x_range: 1D array of real parts (one per column).
+    :param y_range: 1D array of imaginary parts (one per row).
+    :return: 2D complex128 array of shape (len(y_range), len(x_range)).
+    """
+    c = np.empty((len(y_range), len(x_range)), dtype=np.complex128)
+    c.real = np.asarray(x_range, dtype=np.float64)[np.newaxis, :]  # Assign parts directly so c is exactly complex(x, y)
+    c.imag = np.asarray(y_range, dtype=np.float64)[:, np.newaxis]
+    return c
+
+
+def count_dtype(max_iter):
+    """
+    Picks the smallest unsigned integer type that holds escape counts up to max_iter.
+    :param max_iter: Maximum number of iterations.
+    :return: numpy.uint16 or numpy.uint32.
+    """
+    return np.uint16 if max_iter <= np.iinfo(np.uint16).max else np.uint32
+
+
+def escape_counts_python(x_range, y_range, max_iter, out=None, fraction=None, stats=None, **options):
+    """
+    Computes escape counts for a grid one pixel at a time (reference backend).
+    :param x_range: 1D array of real parts (one per column).
+    :param y_range: 1D array of imaginary parts (one per row).
+    :param max_iter: Maximum number of iterations.
+    :param out: Optional integer array of shape (len(y_range), len(x_range)) to fill.
+    :param fraction: Optional float32 array of the same shape that receives the smooth-coloring fraction.
+    :param stats: Optional counter dictionary (see new_shortcut_stats); only iterations is counted.
+    :param options: Ignored; the reference backend always iterates every point in full.
+    :return: 2D integer array of escape counts.
+    """
+    if out is None:
+        out = np.empty((len(y_range), len(x_range)), dtype=count_dtype(max_iter))
+    for i, y in enumerate(y_range):
+        for j, x in enumerate(x_range):
+            if fraction is None:
+                out[i, j] = escape_time(x, y, max_iter)
+                continue
+            count, z = escape_orbit(x, y, max_iter)
+            out[i, j] = count
+            fraction[i, j] = 1.0 - math.log2(math.log2(abs(z))) if count < max_iter else 0.0
+    if stats is not None:
+        stats["iterations"] += int(out.sum(dtype=np.int64))  # A point's count is the number of updates it took
+    return out
+
+
+def interior_masks(c):
+    """
+    Finds the points that lie inside the main cardioid or the period-2 bulb.
+    Both regions are part of the set, so these points never escape.
+    :param c: Array of complex points.
+    :return: (cardioid, bulb) boolean arrays.
+    """
+    x, y = c.real, c.imag
+    y2 = y * y
+    xq = x - 0.25
+    q = xq * xq + y2
+    cardioid = q * (q + xq) < 0.25 * y2  # Strict inequalities keep boundary points on the iterated path
+    xb = x + 1.0
+    bulb = ~cardioid & (xb * xb + y2 < 0.0625)
+    return cardioid, bulb
+
+
+def new_shortcut_stats():
+    """
+    Creates an empty counter dictionary for the interior short-circuits.
+    :return: Dictionary of counters (pixels skipped per test, iterations saved and iterations done).
+    """
+    return {"cardioid": 0, "bulb": 0, "periodicity": 0, "iterations_saved": 0, "iterations": 0}
+
+
+def escape_counts_points(c, max_iter, out=None, interior_check=True, periodicity_check=True, stats=None,
+                         fraction=None, dtype=np.float64):
+    """
+    Computes escape counts for a flat array of points with NumPy.
+    Only the points that have not escaped yet are kept in the working arrays,
+    so escaped points cost nothing in later iterations.
+    :param c: 1D complex128 array of points.
+    :param max_iter: Maximum number of iterations.
+    :param out: Optional contiguous 1D integer array of len(c) to fill.
+    :param interior_check: Skip points inside the main cardioid and the period-2 bulb.
+    :param periodicity_check: Stop iterating points whose orbit repeats exactly (Brent's cycle detection).
+    :param stats: Optional counter dictionary (see new_shortcut_stats) updated in place.
+    :param fraction: Optional contiguous 1D float32 array of len(c) that receives the smooth-coloring
+                     fraction 1 - log2(log2(abs(z))) of every escaped point (0 for points that do not escape).
+    :param dtype: Floating-point type the orbits are iterated in; only float64 matches escape_time exactly.
+    :return: 1D integer array of escape counts.
+    """
+    counts = np.empty(len(c), dtype=count_dtype(max_iter)) if out is None else out
+    if fraction is not None:
+        fraction[:] = 0
+    if stats is None:
+        stats = new_shortcut_stats()
+    counts[:] = max_iter  # Points that never escape keep max_iter
+    active = np.arange(len(c))  # Indices of the points still iterating
+
+    if interior_check and max_iter > 0:
+        cardioid, bulb = interior_masks(c)
+        skipped = cardioid | bulb
+        stats["cardioid"] += int(cardioid.sum())
+        stats["bulb"] += int(bulb.sum())
+        stats["iterations_saved"] += int(skipped.sum()) * max_iter
+        keep = ~skipped
+        active, c = active[keep], c[keep]
+
+    # Iterate on separate real/imaginary float64 arrays: NumPy's complex multiply and abs
+    # may use fused or rescaled arithmetic, which would not match Python's complex results
+    cr, ci = c.real.astype(dtype), c.imag.astype(dtype)
+    zr, zi = np.zeros_like(cr), np.zeros_like(ci)
+    sr, si = np.zeros_like(cr), np.zeros_like(ci)  # Orbit value each point is compared against for cycles
+    next_save = 1  # Brent's method: re-save the orbit at iterations 1, 2, 4, 8, ...
+
+    for i in range(max_iter):
+        if active.size == 0:
+            break
+        zr2, zi2 = zr * zr, zi * zi
+        # Same test as the reference, abs(z) > 2.0; the exact hypot is only needed near the circle
+        escaped = zr2 + zi2 > 3.99
+        if escaped.any():
+            escaped[escaped] = np.hypot(zr[escaped], zi[escaped]) > 2.0
+        if escaped.any():
+            counts[active[escaped]] = i
+            if fraction is not None:
+                magnitude = np.hypot(zr[escaped], zi[escaped])
+                fraction[active[escaped]] = 1.0 - np.log2(np.log2(magnitude))
+            keep = ~escaped
+            active, zr, zi, zr2, zi2, cr, ci, sr, si = (
+                a[keep] for a in (active, zr, zi, zr2, zi2, cr, ci, sr, si))  # Shrink the active set
+        stats["iterations"] += active.size
+        # z = z * z + c, with the same operation order as Python's complex arithmetic
+        zrzi = zr * zi
+        zr, zi = zr2 - zi2 + cr, zrzi + zrzi + ci
+
+        if periodicity_check:
+            # An exact repeat means the orbit cycles through values already tested, so it never escapes
+            cycled = (zr == sr) & (zi == si)
+            if cycled.any():
+                stats["periodicity"] += int(cycled.sum())
+                stats["iterations_saved"] += int(cycled.sum()) * (max_iter - i - 1)
+                keep = ~cycled
+                active, zr, zi, cr, ci, sr, si = (a[keep] for a in (active, zr, zi, cr, ci, sr, si))
+            if i + 1 == next_save:
+                sr, si = zr.copy(), zi.copy()
+                next_save *= 2
+
+    return counts
+
+
+def escape_counts_numpy(x_range, y_range, max_iter, out=None, fraction=None, **options):
+    """
+    Computes escape counts for a whole grid at once with NumPy.
+    :param x_range: 1D array of real parts (one per column).
+    :param y_range: 1D array of imaginary parts (one per row).
+    :param max_iter: Maximum number of iterations.
+    :param out: Optional integer array of shape (len(y_range), len(x_range)) to fill.
+    :param fraction: Optional float32 array of the same shape that receives the smooth-coloring fraction.
+    :param options: Options for escape_counts_points (interior_check, periodicity_check, stats).
+    :return: 2D integer array of escape counts.
+    """
+    if out is None:
+        out = np.empty((len(y_range), len(x_range)), dtype=count_dtype(max_iter))
+    # Flat views so active indices address the buffers directly (a slice of a larger
+    # framebuffer is not contiguous, so it is computed in a scratch array and copied back)
+    counts = out.reshape(-1) if out.flags.c_contiguous else np.empty(out.size, dtype=out.dtype)
+    flat_fraction = None
+    if fraction is not None:
+        flat_fraction = fraction.reshape(-1) if fraction.flags.c_contiguous else np.empty(fraction.size, np.float32)
+    escape_counts_points(complex_grid(x_range, y_range).reshape(-1), max_iter, out=counts,
+                         fraction=flat_fraction, **options)
+    if not out.flags.c_contiguous:
+        out[...] = counts.reshape(out.shape)
+    if fraction is not None and not fraction.flags.c_contiguous:
+        fraction[...] = flat_fraction.reshape(fraction.shape)
+    return out
+
+
+def escape_counts_numba(x_range, y_range, max_iter, out=None, fraction=None, interior_check=True,
+                        periodicity_check=True, stats=None):
+    """
+    Computes escape counts with the numba-compiled kernel, rows spread over all cores.
+    Each pixel runs a tight scalar loop, so early escapes cost nothing and there are no temporaries.
+    :param x_range: 1D array of real parts (one per column).
+    :param y_range: 1D array of imaginary parts (one per row).
+    :param max_iter: Maximum number of iterations.
+    :param out: Optional integer array of shape (len(y_range), len(x_range)) to fill.
+    :param fraction: Optional float32 array of the same shape that receives the smooth-coloring fraction.
+    :param interior_check: Skip points inside the main cardioid and the period-2 bulb.
+    :param periodicity_check: Stop iterating points whose orbit repeats exactly (Brent's cycle detection).
+    :param stats: Optional counter dictionary (see new_shortcut_stats) updated in place.
+    :return: 2D integer array of escape counts.
+    """
+    x_range = np.asarray(x_range, dtype=np.float64)
+    y_range = np.asarray(y_range, dtype=np.float64)
+    if out is None:
+        out = np.empty((len(y_range), len(x_range)), dtype=count_dtype(max_iter))
+    row_stats = np.zeros((len(y_range), 5), dtype=np.int64)  # Per-row counters, so threads never share one
+    escape_rows(x_range, y_range, max_iter, out, np.empty((1, 1), np.float32) if fraction is None else fraction,
+                fraction is not None, interior_check, periodicity_check, row_stats)
+    _add_jit_stats(stats, row_stats)
+    return out
+
+
+def limit_threads(backend, threads=1):
+    """
+    Caps the number of threads a backend's kernels may use.
+    Pool workers already run one per core, so each of them should compute on a single thread.
+    :param backend: Key of BACKENDS.
+    :param threads: Maximum number of threads.
+    """
+    if backend == "numba":
+        set_num_threads(threads)
+
+
+def _add_jit_stats(stats, counters):
+    """
+    Adds the per-row or per-chunk counters of the numba kernel to a shortcut stats dictionary.
+    """
+    if stats is not None:
+        totals = counters.sum(axis=0)
+        for column, key in enumerate(("cardioid", "bulb", "periodicity", "iterations_saved", "iterations")):
+            stats[key] += int(totals[column])
+
+
+# Available escape-count backends, keyed by name
+BACKENDS = {
+    "python": escape_counts_python,
+    "numpy": escape_counts_numpy,
+}
+if escape_rows is not None:
+    BACKENDS["numba"] = escape_counts_numba
+
+# Backends that need an optional package, and what to use instead when it is missing
+OPTIONAL_BACKENDS = {"numba": "numpy"}
+
+
+def resolve_backend(backend=None):
+    """
+    Turns a backend setting into the name of an available backend.
+    :param backend: Backend name, "auto" for the fastest one installed, or None to read
+                    the MANDELBROT_BACKEND environment variable (which defaults to "auto").
+    :return: Key of BACKENDS.
+    """
+    if backend is None:
+        backend = os.environ.get(BACKEND_ENV, "auto")
+    if backend == "auto":
+        return "numba" if "numba" in BACKENDS else "numpy"
+    if backend not in BACKENDS and backend in OPTIONAL_BACKENDS:
+        warnings.warn(f"Backend {backend!r} is not installed, using {OPTIONAL_BACKENDS[backend]!r}")
+        return OPTIONAL_BACKENDS[backend]
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend!r} (available: {', '.join(BACKENDS)})")
+    return backend
+
+
+def escape_counts(x_range, y_range, max_iter, backend=None, out=None, **options):
+    """
+    Computes escape counts for a grid using the selected backend.
+    :param x_range: 1D array of real parts (one per column).
+    :param y_range: 1D array of imaginary parts (one per row).
+    :param max_iter: Maximum number of iterations.
+    :param backend: Backend setting (see resolve_backend).
+    :param out: Optional integer array to fill.
+    :param options: Backend-specific options (e.g. interior_check, periodicity_check, stats).
+    :return: 2D integer array of escape counts.
+    """
+    return BACKENDS[resolve_backend(backend)](x_range, y_range, max_iter, out=out, **options)
+
+
+def escape_counts_flat(c, max_iter, backend=None, out=None, **options):
+    """
+    Computes escape counts for a flat array of arbitrary points using the selected backend.
+    :param c: 1D complex128 array of points.
+    :param max_iter: Maximum number of iterations.
+    :param backend: Backend setting (see resolve_backend).
+    :param out: Optional contiguous 1D integer array of len(c) to fill.
+    :param options: Options for escape_counts_points (interior_check, periodicity_check, stats).
+    :return: 1D integer array of escape counts.
+    """
+    backend = resolve_backend(backend)
+    if backend == "python":
+        if out is None:
+            out = np.empty(len(c), dtype=count_dtype(max_iter))
+        out[:] = [escape_time(z.real, z.imag, max_iter) for z in c]
+        if options.get("stats") is not None:
+            options["stats"]["iterations"] += int(out.sum(dtype=np.int64))
+        return out
+    if backend == "numba":
+        if out is None:
+            out = np.empty(len(c), dtype=count_dtype(max_iter))
+        chunk_stats = np.zeros((max(1, min(len(c), 256)), 5), dtype=np.int64)  # Small chunks balance the threads
+        escape_points(np.ascontiguousarray(c.real), np.ascontiguousarray(c.imag), max_iter, out,
+                      options.get("interior_check", True), options.get("periodicity_check", True), chunk_stats)
+        _add_jit_stats(options.get("stats"), chunk_stats)
+        return out
+    return escape_counts_points(c, max_iter, out=out, **options)
+
+
+def check_backends(max_iter=500, size=48):
+    """
+    Renders a few views with every available backend and compares them with the python reference.
+    :param max_iter: Maximum number of iterations.
+    :param size: Width and height of each test view in pixels.
+    :return: Dictionary of backend name to number of pixels that differ from the reference.
+    """
+    views = [(-2.0, 1.0, -1.5, 1.5), (-0.75, -0.74, 0.1, 0.11), (-1.8, -1.7, -0.05, 0.05)]
+    mismatches = dict.fromkeys(BACKENDS, 0)
+    for xmin, xmax, ymin, ymax in views:
+        x_range = np.linspace(xmin, xmax, size)
+        y_range = np.linspace(ymin, ymax, size)
+        reference = escape_counts_python(x_range, y_range, max_iter)
+        for name, backend in BACKENDS.items():
+            mismatches[name] += int((backend(x_range, y_range, max_iter) != reference).sum())
+    return mismatches
+
+
+def counts_to_grayscale(counts, max_iter, out=None):
+    """
+    Maps escape counts to grayscale RGB pixels (255 for fast escape, 0 inside the set).
+    :param counts: 2D integer array of escape counts.
+    :param max_iter: Maximum number of iterations.
+    :param out: Optional uint8 array of shape counts.shape + (3,) to fill.
+    :return: 3D uint8 array of pixel colors.
+    """
+    return apply_palette(counts, grayscale_palette(max_iter), out=out)
@@ -0,0 +1,77 @@
+# streaming escape-count histograms for histogram-equalized coloring
+import numpy as np
+
+
+class CountHistogram:
+    """
+    Running histogram of escape counts.
+    Tiles (or frames) are added as they finish and partial histograms from different
+    workers can be merged, so the global distribution is known without keeping any
+    counts around; memory is one bin per iteration count, whatever the image size.
+    """
+
+    def __init__(self, max_iter):
+        """
+        :param max_iter: Maximum number of iterations (counts range over 0..max_iter).
+        """
+        self.max_iter = max_iter
+        self.bins = np.zeros(max_iter + 1, dtype=np.float64)  # Float so fade can weight older frames down
+
+    def update(self, counts):
+        """
+        Adds a tile or frame of escape counts.
+        :param counts: Integer array of escape counts.
+        :return: self, so updates can be chained.
+        """
+        self.bins += np.bincount(np.asarray(counts).reshape(-1), minlength=self.max_iter + 1)[:self.max_iter + 1]
+        return self
+
+    def merge(self, other):
+        """
+        Adds another histogram (e.g. a worker's partial histogram) into this one.
+        :param other: CountHistogram with the same max_iter.
+        :return: self.
+        """
+        if other.max_iter != self.max_iter:
+            raise ValueError(f"Cannot merge histograms of max_iter {other.max_iter} and {self.max_iter}")
+        self.bins += other.bins
+        return self
+
+    def fade(self, factor):
+        """
+        Scales the accumulated counts down, so in a frame sequence recent frames dominate
+        and the palette follows the zoom without flickering from frame to frame.
+        :param factor: Weight kept by everything added so far (0 forgets it, 1 keeps it).
+        :return: self.
+        """
+        self.bins *= factor
+        return self
+
+    def total(self):
+        """
+        :return: Weighted number of pixels added so far.
+        """
+        return float(self.bins.sum())
+
+    def cdf(self):
+        """
+        Computes the cumulative distribution of the escaped counts.
+        :return: Array of max_iter + 1 values in [0, 1]: the fraction of escaped pixels with a
+                 count at or below each count (the entry for max_iter, the interior, is 1).
+        """
+        escaped = np.cumsum(self.bins[:-1])
+        cdf = np.ones(self.max_iter + 1)
+        if escaped.size and escaped[-1] > 0:
+            cdf[:-1] = escaped / escaped[-1]
+        return cdf
+
+    def equalized_palette(self, lut):
+        """
+        Remaps a palette so escaped pixels spread evenly over its colors.
+        The result is an ordinary lookup table, so every tile can be colored with
+        apply_palette once the histogram is complete.
+        :param lut: (max_iter + 1, 3) uint8 palette; its last entry is the color of the set.
+        :return: (max_iter + 1, 3) uint8 palette.
+        """
+        index = np.rint(self.cdf()[:-1] * (self.max_iter - 1)).astype(np.intp)
+        return np.concatenate((lut[index], lut[-1:]))
@@ -0,0 +1,97 @@
+# numba-compiled escape-time kernel (optional: importing this module fails without numba)
+import math
+from numba import njit, prange, set_num_threads  # set_num_threads is re-exported for mandelbrot_engine
+
+# Per-row counters written by escape_rows, in this column order
+STAT_CARDIOID, STAT_BULB, STAT_PERIODICITY, STAT_SAVED, STAT_ITERATIONS = range(5)
+
+
+@njit(cache=True)
+def _escape_point(cr, ci, max_iter, interior_check, periodicity_check, row_stats):
+    """
+    Iterates one point exactly like escape_counts_points in mandelbrot_engine.
+    :return: (count, zr, zi) with z the first value outside the escape radius.
+    """
+    if interior_check and max_iter > 0:
+        y2 = ci * ci
+        xq = cr - 0.25
+        q = xq * xq + y2
+        if q * (q + xq) < 0.25 * y2:
+            row_stats[STAT_CARDIOID] += 1
+            row_stats[STAT_SAVED] += max_iter
+            return max_iter, 0.0, 0.0
+        xb = cr + 1.0
+        if xb * xb + y2 < 0.0625:
+            row_stats[STAT_BULB] += 1
+            row_stats[STAT_SAVED] += max_iter
+            return max_iter, 0.0, 0.0
+
+    zr = 0.0
+    zi = 0.0
+    sr = 0.0
+    si = 0.0
+    next_save = 1
+    for i in range(max_iter):
+        zr2 = zr * zr
+        zi2 = zi * zi
+        # Same test as the reference, abs(z) > 2.0; the exact hypot is only needed near the circle
+        if zr2 + zi2 > 3.99 and math.hypot(zr, zi) > 2.0:
+            return i, zr, zi
+        row_stats[STAT_ITERATIONS] += 1
+        zrzi = zr * zi
+        zr = zr2 - zi2 + cr
+        zi = zrzi + zrzi + ci
+        if periodicity_check:
+            if zr == sr and zi == si:
+                row_stats[STAT_PERIODICITY] += 1
+                row_stats[STAT_SAVED] += max_iter - i - 1
+                return max_iter, zr, zi
+            if i + 1 == next_save:
+                sr = zr
+                si = zi
+                next_save *= 2
+    return max_iter, zr, zi
+
+
+@njit(parallel=True, cache=True)
+def escape_rows(x_range, y_range, max_iter, out, fraction, want_fraction, interior_check, periodicity_check,
+                row_stats):
+    """
+    Fills out (and fraction, if want_fraction) for a grid, one row per thread at a time.
+    :param x_range: 1D float64 array of real parts (one per column).
+    :param y_range: 1D float64 array of imaginary parts (one per row).
+    :param max_iter: Maximum number of iterations.
+    :param out: 2D integer array of shape (len(y_range), len(x_range)).
+    :param fraction: 2D float32 array of the same shape (ignored unless want_fraction).
+    :param want_fraction: Whether to store the smooth-coloring fraction of escaped points.
+    :param interior_check: Skip points inside the main cardioid and the period-2 bulb.
+    :param periodicity_check: Stop iterating points whose orbit repeats exactly.
+    :param row_stats: (len(y_range), 5) int64 array of per-row counters (see the STAT_* columns).
+    """
+    for row in prange(len(y_range)):
+        ci = y_range[row]
+        for col in range(len(x_range)):
+            count, zr, zi = _escape_point(x_range[col], ci, max_iter, interior_check, periodicity_check,
+                                          row_stats[row])
+            out[row, col] = count
+            if want_fraction:
+                fraction[row, col] = 1.0 - math.log2(math.log2(math.hypot(zr, zi))) if count < max_iter else 0.0
+
+
+@njit(parallel=True, cache=True)
+def escape_points(cr, ci, max_iter, out, interior_check, periodicity_check, chunk_stats):
+    """
+    Fills out for a flat list of points, one chunk of points per thread at a time.
+    :param cr: 1D float64 array of real parts.
+    :param ci: 1D float64 array of imaginary parts.
+    :param max_iter: Maximum number of iterations.
+    :param out: 1D integer array of len(cr).
+    :param interior_check: Skip points inside the main cardioid and the period-2 bulb.
+    :param periodicity_check: Stop iterating points whose orbit repeats exactly.
+    :param chunk_stats: (chunks, 5) int64 array of per-chunk counters (see the STAT_* columns).
+    """
+    chunks = chunk_stats.shape[0]
+    size = (len(cr) + chunks - 1) // chunks
+    for chunk in prange(chunks):
+        for i in range(chunk * size, min(len(cr), (chunk + 1) * size)):
+            out[i] = _escape_point(cr[i], ci[i], max_iter, interior_check, periodicity_check, chunk_stats[chunk])[0]
@@ -0,0 +1,94 @@
+# out-of-core mandelbrot renders backed by memory-mapped files
+import json
+import os
+import numpy as np
+from mandelbrot_engine import escape_counts, counts_to_grayscale
+
+# Rough working memory of the NumPy kernel per pixel of a band (grid, orbit arrays, temporaries)
+KERNEL_BYTES_PER_PIXEL = 160
+
+
+def band_rows(width, memory_limit):
+    """
+    Picks how many rows to render at once so the working set stays under the memory limit.
+    :param width: Image width in pixels.
+    :param memory_limit: Working-set budget in bytes.
+    :return: Number of rows per band (at least 1).
+    """
+    per_row = width * (KERNEL_BYTES_PER_PIXEL + 3)  # Kernel state plus the RGB band being written
+    return max(1, int(memory_limit // per_row))
+
+
+def _load_progress(path, params):
+    """
+    Reads the number of completed rows of an earlier render with the same parameters.
+    :return: Completed rows, or 0 if there is nothing to resume.
+    """
+    try:
+        with open(path) as f:
+            progress = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    return progress["rows_done"] if progress.get("params") == params else 0
+
+
+def _save_progress(path, params, rows_done):
+    """
+    Records the number of completed rows, replacing the progress file atomically.
+    """
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"params": params, "rows_done": rows_done}, f)
+    os.replace(tmp, path)
+
+
+def render_to_file(path, xmin, xmax, ymin, ymax, width, height, max_iter, memory_limit=256 * 1024 * 1024,
+                   progress=None, **options):
+    """
+    Renders a grayscale Mandelbrot image of any size into a .npy file, one row band at a time.
+    The output has the same layout as generate_mandelbrot in a.py: a (height, width, 3) uint8
+    array whose row i is y = linspace(ymin, ymax, height)[i]. Only the band being rendered is
+    mapped, so resident memory is bounded by memory_limit rather than by the image size.
+    Progress is recorded after every band; rerunning with the same parameters resumes after
+    the last completed band.
+    :param path: Output .npy path (open it later with numpy.load(path, mmap_mode="r")).
+    :param xmin: Left bound of the view.
+    :param xmax: Right bound of the view.
+    :param ymin: Bottom bound of the view.
+    :param ymax: Top bound of the view.
+    :param width: Image width in pixels.
+    :param height: Image height in pixels.
+    :param max_iter: Maximum number of iterations.
+    :param memory_limit: Working-set budget in bytes.
+    :param progress: Optional callback(rows_done, height) called after every band.
+    :param options: Options for the escape-time kernel (interior_check, periodicity_check, stats).
+    :return: Path of the output file.
+    """
+    params = [xmin, xmax, ymin, ymax, width, height, max_iter]
+    progress_path = path + ".progress"
+    rows_done = _load_progress(progress_path, params) if os.path.exists(path) else 0
+    if rows_done == 0:
+        # Create the file with its .npy header; the data is filled in band by band
+        np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=(height, width, 3))
+        _save_progress(progress_path, params, 0)
+    with open(path, "rb") as f:
+        np.lib.format.read_magic(f)
+        np.lib.format.read_array_header_1_0(f)
+        data_offset = f.tell()
+
+    x_range = np.linspace(xmin, xmax, width)
+    y_range = np.linspace(ymin, ymax, height)
+    rows = band_rows(width, memory_limit)
+    while rows_done < height:
+        r0, r1 = rows_done, min(rows_done + rows, height)
+        counts = escape_counts(x_range, y_range[r0:r1], max_iter, **options)
+        band = np.memmap(path, dtype=np.uint8, mode="r+", offset=data_offset + r0 * width * 3,
+                         shape=(r1 - r0, width, 3))
+        counts_to_grayscale(counts, max_iter, out=band)
+        band.flush()
+        del band, counts  # Unmap the band so its pages do not stay resident
+        rows_done = r1
+        _save_progress(progress_path, params, rows_done)
+        if progress is not None:
+            progress(rows_done, height)
+    return path
@@ -0,0 +1,254 @@
+# precision tiers for mandelbrot escape counts: float32, float64 and double-double
+import argparse
+import time
+import numpy as np
+from mandelbrot_engine import (count_dtype, escape_counts, escape_counts_points, interior_masks, new_shortcut_stats,
+                               resolve_backend)
+
+# Tiers from cheapest to most precise
+TIERS = ("float32", "float64", "double-double")
+# Unit roundoff of each tier
+TIER_EPSILON = {"float32": 2.0 ** -24, "float64": 2.0 ** -53, "double-double": 2.0 ** -104}
+# A tier is used only while a pixel spans at least this many units of roundoff, which leaves room
+# for the error that builds up over the iterations before neighbouring pixels stop being told apart
+SAFETY = 2.0 ** 12
+
+
+def pixel_spacing(span_x, span_y, width, height):
+    """
+    Finds the distance between neighbouring pixel centres (np.linspace spacing).
+    :param span_x, span_y: Width and height of the view in the complex plane.
+    :param width, height: View size in pixels.
+    :return: Smaller of the horizontal and vertical spacing.
+    """
+    return min(span_x / max(1, width - 1), span_y / max(1, height - 1))
+
+
+def choose_tier(center_x, center_y, span_x, span_y, width, height, safety=SAFETY):
+    """
+    Picks the cheapest precision tier that still resolves the view's pixels.
+    The view is given by its centre and span rather than its bounds: float64 bounds of a view deeper
+    than its roundoff collapse onto each other before any tier could be picked.
+    :param center_x, center_y: Centre of the view.
+    :param span_x, span_y: Width and height of the view in the complex plane.
+    :param width, height: View size in pixels.
+    :param safety: Minimum pixel spacing in units of roundoff (see SAFETY).
+    :return: Name of a tier in TIERS.
+    """
+    spacing = pixel_spacing(span_x, span_y, width, height)
+    scale = max(abs(center_x) + span_x / 2, abs(center_y) + span_y / 2, 2.0)  # Orbits grow to |z| = 2 before escaping
+    for tier in TIERS:
+        if spacing >= scale * TIER_EPSILON[tier] * safety:
+            return tier
+    return TIERS[-1]
+
+
+def _two_sum(a, b):
+    """Exact sum: a + b == s + e (Knuth)."""
+    s = a + b
+    bb = s - a
+    return s, (a - (s - bb)) + (b - bb)
+
+
+def _split(a):
+    """Splits float64 values into two halves whose products are exact (Dekker)."""
+    t = 134217729.0 * a  # 2^27 + 1
+    hi = t - (t - a)
+    return hi, a - hi
+
+
+def _two_prod(a, b):
+    """Exact product: a * b == p + e (Dekker, since NumPy does not fuse multiply-adds)."""
+    p = a * b
+    ah, al = _split(a)
+    bh, bl = _split(b)
+    return p, ((ah * bh - p) + ah * bl + al * bh) + al * bl
+
+
+def _dd_add(ah, al, bh, bl):
+    """Adds two double-double numbers."""
+    s, e = _two_sum(ah, bh)
+    e += al + bl
+    return _two_sum(s, e)
+
+
+def _dd_mul(ah, al, bh, bl):
+    """Multiplies two double-double numbers."""
+    p, e = _two_prod(ah, bh)
+    e += ah * bl + al * bh
+    return _two_sum(p, e)
+
+
+def _dd_axis(center, span, n):
+    """
+    Computes center + (i - (n - 1) / 2) * span / (n - 1) for i = 0..n-1 in double-double, so pixels
+    stay distinct even when the spacing is far below the resolution of float64 at center.
+    :return: (hi, lo) float64 arrays.
+    """
+    offsets = np.arange(n, dtype=np.float64) - (n - 1) / 2  # Half-integers, exact in float64
+    p, e = _two_prod(offsets, np.float64(span / max(1, n - 1)))
+    return _dd_add(np.full(n, np.float64(center)), np.zeros(n), p, e)
+
+
+def escape_counts_double_double(center_x, center_y, span_x, span_y, width, height, max_iter, out=None,
+                                interior_check=True, periodicity_check=True, stats=None):
+    """
+    Computes escape counts with double-double arithmetic (about 32 significant digits).
+    Pixel coordinates are the centre plus offsets of whole pixel spacings, evaluated in double-double,
+    and the escape test is abs(z) > 2, as in escape_time.
+    :param center_x, center_y: Centre of the view.
+    :param span_x, span_y: Width and height of the view in the complex plane.
+    :param width, height: View size in pixels.
+    :param max_iter: Maximum number of iterations.
+    :param out: Optional integer array of shape (height, width) to fill.
+    :param interior_check: Skip points inside the main cardioid and the period-2 bulb.
+    :param periodicity_check: Stop iterating points whose orbit repeats exactly.
+    :param stats: Optional counter dictionary (see new_shortcut_stats) updated in place.
+    :return: 2D integer array of escape counts.
+    """
+    if out is None:
+        out = np.empty((height, width), dtype=count_dtype(max_iter))
+    if stats is None:
+        stats = new_shortcut_stats()
+    xh, xl = _dd_axis(center_x, span_x, width)
+    yh, yl = _dd_axis(center_y, span_y, height)
+    crh, crl = (np.repeat(a[np.newaxis, :], height, axis=0).reshape(-1) for a in (xh, xl))
+    cih, cil = (np.repeat(a[:, np.newaxis], width, axis=1).reshape(-1) for a in (yh, yl))
+    counts = np.full(width * height, max_iter, dtype=out.dtype)
+    active = np.arange(width * height)
+
+    if interior_check and max_iter > 0:
+        cardioid, bulb = interior_masks(crh + 1j * cih)  # The tests are far from the boundary, so float64 is enough
+        skipped = cardioid | bulb
+        stats["cardioid"] += int(cardioid.sum())
+        stats["bulb"] += int(bulb.sum())
+        stats["iterations_saved"] += int(skipped.sum()) * max_iter
+        keep = ~skipped
+        active, crh, crl, cih, cil = (a[keep] for a in (active, crh, crl, cih, cil))
+
+    zrh, zrl, zih, zil = (np.zeros(active.size) for _ in range(4))
+    srh, srl, sih, sil = (np.zeros(active.size) for _ in range(4))  # Saved orbit value for cycle detection
+    next_save = 1
+    for i in range(max_iter):
+        if active.size == 0:
+            break
+        r2h, r2l = _dd_mul(zrh, zrl, zrh, zrl)
+        i2h, i2l = _dd_mul(zih, zil, zih, zil)
+        mh, ml = _dd_add(r2h, r2l, i2h, i2l)
+        escaped = mh + ml > 4.0
+        if escaped.any():
+            counts[active[escaped]] = i
+            keep = ~escaped
+            (active, zrh, zrl, zih, zil, r2h, r2l, i2h, i2l, crh, crl, cih, cil, srh, srl, sih, sil) = (
+                a[keep] for a in (active, zrh, zrl, zih, zil, r2h, r2l, i2h, i2l, crh, crl, cih, cil,
+                                  srh, srl, sih, sil))
+        stats["iterations"] += active.size
+        # z = z * z + c
+        ph, pl = _dd_mul(zrh, zrl, zih, zil)
+        dh, dl = _dd_add(r2h, r2l, -i2h, -i2l)
+        zrh, zrl = _dd_add(dh, dl, crh, crl)
+        zih, zil = _dd_add(2 * ph, 2 * pl, cih, cil)
+
+        if periodicity_check:
+            cycled = (zrh == srh) & (zrl == srl) & (zih == sih) & (zil == sil)
+            if cycled.any():
+                stats["periodicity"] += int(cycled.sum())
+                stats["iterations_saved"] += int(cycled.sum()) * (max_iter - i - 1)
+                keep = ~cycled
+                (active, zrh, zrl, zih, zil, crh, crl, cih, cil, srh, srl, sih, sil) = (
+                    a[keep] for a in (active, zrh, zrl, zih, zil, crh, crl, cih, cil, srh, srl, sih, sil))
+            if i + 1 == next_save:
+                srh, srl, sih, sil = zrh.copy(), zrl.copy(), zih.copy(), zil.copy()
+                next_save *= 2
+
+    out[...] = counts.reshape(height, width)
+    return out
+
+
+def escape_counts_tiered(center_x, center_y, span_x, span_y, width, height, max_iter, tier=None, backend=None,
+                         out=None, info=None, **options):
+    """
+    Computes escape counts for a view in the cheapest precision that resolves it.
+    The float32 tier runs on the NumPy kernels only. The compiled backends iterate one scalar at a time,
+    where float32 is no faster than float64, so they compute it in float64 and info records the downgrade.
+    :param center_x, center_y: Centre of the view.
+    :param span_x, span_y: Width and height of the view in the complex plane.
+    :param width, height: View size in pixels.
+    :param max_iter: Maximum number of iterations.
+    :param tier: Tier in TIERS, or None to pick one with choose_tier.
+    :param backend: Escape-time backend for the float64 tier (see resolve_backend).
+    :param out: Optional integer array of shape (height, width) to fill.
+    :param info: Optional dictionary that receives the tier used, the tier chosen for the view
+                 (chosen_tier, which differs only after a downgrade) and the pixel spacing.
+    :param options: Options for the kernels (interior_check, periodicity_check, stats).
+    :return: 2D integer array of escape counts.
+    """
+    backend = resolve_backend(backend)
+    chosen = tier
+    if tier is None:
+        chosen = tier = choose_tier(center_x, center_y, span_x, span_y, width, height)
+        if tier == "float32" and backend != "numpy":
+            tier = "float64"  # Only NumPy's ufuncs gain from float32 lanes; the other backends iterate scalars
+    if tier not in TIERS:
+        raise ValueError(f"Unknown precision tier: {tier!r} (available: {', '.join(TIERS)})")
+    if info is not None:
+        info["tier"] = tier
+        info["chosen_tier"] = chosen
+        info["spacing"] = pixel_spacing(span_x, span_y, width, height)
+    if tier == "double-double":
+        return escape_counts_double_double(center_x, center_y, span_x, span_y, width, height, max_iter, out=out,
+                                           **options)
+    x_range = np.linspace(center_x - span_x / 2, center_x + span_x / 2, width)
+    y_range = np.linspace(center_y - span_y / 2, center_y + span_y / 2, height)
+    if tier == "float64":
+        return escape_counts(x_range, y_range, max_iter, backend=backend, out=out, **options)
+    if out is None:
+        out = np.empty((height, width), dtype=count_dtype(max_iter))
+    c = np.empty((height, width), dtype=np.complex128)
+    c.real = x_range[np.newaxis, :]
+    c.imag = y_range[:, np.newaxis]
+    out[...] = escape_counts_points(c.reshape(-1), max_iter, dtype=np.float32, **options).reshape(height, width)
+    return out
+
+
+def benchmark(width=800, height=800, max_iter=256, repeat=3):
+    """
+    Times every tier on the full view, where all of them are safe, with the NumPy kernels.
+    :return: Dictionary of tier name to (seconds, Mpixels/s, fraction of pixels that differ from float64).
+    """
+    view = (-0.5, 0.0, 3.0, 3.0)  # Centre and span of the full set
+    reference = escape_counts_tiered(*view, width, height, max_iter, tier="float64", backend="numpy")
+    results = {}
+    for tier in TIERS:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            counts = escape_counts_tiered(*view, width, height, max_iter, tier=tier, backend="numpy")
+            best = min(best, time.perf_counter() - start)
+        results[tier] = (best, width * height / best / 1e6, float((counts != reference).mean()))
+    return results
+
+
+def main(argv=None):
+    """
+    Prints the tier benchmark and the tier chosen at a range of zoom depths.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the precision tiers of the escape-time kernel.")
+    parser.add_argument("--width", type=int, default=800)
+    parser.add_argument("--height", type=int, default=800)
+    parser.add_argument("--max-iter", type=int, default=256)
+    args = parser.parse_args(argv)
+
+    print(f"Full view, {args.width}x{args.height}, max_iter {args.max_iter} "
+          f"(safe tier: {choose_tier(-0.5, 0.0, 3.0, 3.0, args.width, args.height)})")
+    results = benchmark(args.width, args.height, args.max_iter)
+    for tier, (seconds, rate, differ) in results.items():
+        speedup = results["float64"][0] / seconds
+        print(f"{tier:14s} {seconds:.3f}s {rate:7.2f} Mpixels/s  x{speedup:.2f}  {differ:.3%} pixels differ")
+    for exponent in range(0, 31, 3):
+        span = 3.0 * 10.0 ** -exponent
+        print(f"span 3e-{exponent:02d}: {choose_tier(-0.75, 0.1, span, span, args.width, args.height)}")
+
+
+if __name__ == "__main__":
+    main()
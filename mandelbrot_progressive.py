@@ -0,0 +1,44 @@
+# progressive coarse-to-fine mandelbrot rendering
+import numpy as np
+from mandelbrot_engine import complex_grid, count_dtype, escape_counts_flat, resolve_backend
+
+
+def progressive_counts(x_range, y_range, max_iter, start_stride=16, backend=None, **options):
+    """
+    Computes escape counts in coarse-to-fine passes.
+    The first pass samples every start_stride-th pixel in both directions; each later
+    pass halves the stride and computes only the samples the earlier passes did not
+    have, so the passes together iterate every pixel exactly once.
+    :param x_range: 1D array of real parts (one per column).
+    :param y_range: 1D array of imaginary parts (one per row).
+    :param max_iter: Maximum number of iterations.
+    :param start_stride: Sampling stride of the first pass (a power of two).
+    :param backend: Escape-time backend for every pass (see resolve_backend).
+    :param options: Options for escape_counts_flat (interior_check, periodicity_check, stats).
+    :return: Generator of (stride, counts) where counts is a full-size 2D array in which
+             every pixel takes the value of the nearest computed sample above and to the left.
+    """
+    height, width = len(y_range), len(x_range)
+    backend = resolve_backend(backend)  # Resolved once rather than for every pass
+    c = complex_grid(x_range, y_range)
+    counts = np.empty((height, width), dtype=count_dtype(max_iter))
+    known = np.zeros((height, width), dtype=bool)  # Pixels computed by earlier passes
+
+    stride = max(1, start_stride)
+    while True:
+        rows = np.arange(0, height, stride)
+        cols = np.arange(0, width, stride)
+        lattice = np.ix_(rows, cols)
+        todo = ~known[lattice]  # Samples of this pass not already computed at a coarser stride
+        if todo.any():
+            r, q = rows[np.nonzero(todo)[0]], cols[np.nonzero(todo)[1]]
+            counts[r, q] = escape_counts_flat(c[r, q], max_iter, backend=backend, **options)
+            known[r, q] = True
+
+        if stride == 1:
+            yield stride, counts
+            return
+        # Upscale the computed samples by repeating each one over its stride x stride block
+        samples = counts[lattice]
+        yield stride, np.repeat(np.repeat(samples, stride, axis=0), stride, axis=1)[:height, :width]
+        stride //= 2
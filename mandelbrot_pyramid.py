@@ -0,0 +1,207 @@
+# deep-zoom tile pyramid generator for the mandelbrot set
+import hashlib
+import json
+import math
+import os
+import shutil
+import numpy as np
+from mandelbrot_engine import escape_counts, counts_to_grayscale
+from png_writer import encode_png, read_png
+
+
+class TilePyramid:
+    """
+    XYZ tile pyramid over a square region of the complex plane, stored on disk.
+    Level z has 2**z x 2**z tiles of tile_size pixels; tile (z, x, y) counts y from the top.
+    Tile images are stored once under objects/<hash[:2]>/<hash>.png, keyed by the SHA-256 of
+    their content, so identical tiles (e.g. solid interior) share storage; <z>/<x>/<y>.png
+    links to the object so slippy-map viewers can read the pyramid directly. manifest.json
+    records the parameters, which tiles exist and how each level was made, so a pyramid can be
+    extended later without mixing methods within a level.
+    """
+
+    def __init__(self, root, center=(-0.5, 0.0), half_size=2.0, tile_size=256, max_iter=256):
+        """
+        Opens the pyramid in root, or creates one with the given parameters.
+        :param root: Directory holding the pyramid.
+        :param center: Centre of the level-0 tile in the complex plane.
+        :param half_size: Half the side length of the level-0 tile.
+        :param tile_size: Tile edge in pixels.
+        :param max_iter: Maximum number of iterations (shared by every level so shading matches).
+        """
+        self.root = root
+        self.manifest_path = os.path.join(root, "manifest.json")
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+        else:
+            os.makedirs(root, exist_ok=True)
+            self.manifest = {"center": list(center), "half_size": half_size, "tile_size": tile_size,
+                             "max_iter": max_iter, "tiles": {}, "levels": {}}
+            self.save_manifest()
+        self.stats = {"rendered": 0, "downsampled": 0, "skipped": 0}
+        self._checkpoint = 64  # Number of new tiles between manifest saves (see build)
+        self._pending = 0  # New tiles since the last save
+
+    def save_manifest(self):
+        """
+        Writes manifest.json atomically.
+        """
+        self._pending = 0
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp, self.manifest_path)
+
+    def tile_bounds(self, z, x, y):
+        """
+        :return: (xmin, xmax, ymin, ymax) of a tile in the complex plane.
+        """
+        cx, cy = self.manifest["center"]
+        span = 2 * self.manifest["half_size"] / 2 ** z
+        left = cx - self.manifest["half_size"] + x * span
+        top = cy + self.manifest["half_size"] - y * span
+        return left, left + span, top - span, top
+
+    def tiles_in_region(self, z, region=None):
+        """
+        Lists the tiles of a level that intersect a region.
+        :param z: Zoom level.
+        :param region: (xmin, xmax, ymin, ymax), or None for the whole pyramid.
+        :return: List of (x, y) tile coordinates.
+        """
+        n = 2 ** z
+        if region is None:
+            return [(x, y) for y in range(n) for x in range(n)]
+        cx, cy = self.manifest["center"]
+        half = self.manifest["half_size"]
+        span = 2 * half / n
+        x0 = max(0, int(math.floor((region[0] - (cx - half)) / span)))
+        x1 = min(n - 1, int(math.floor((region[1] - (cx - half)) / span)))
+        y0 = max(0, int(math.floor(((cy + half) - region[3]) / span)))
+        y1 = min(n - 1, int(math.floor(((cy + half) - region[2]) / span)))
+        return [(x, y) for y in range(y0, y1 + 1) for x in range(x0, x1 + 1)]
+
+    def has_tile(self, z, x, y):
+        return f"{z}/{x}/{y}" in self.manifest["tiles"]
+
+    def read_tile(self, z, x, y):
+        """
+        :return: Pixels of a stored tile, row 0 at the top.
+        """
+        return read_png(self._object_path(self.manifest["tiles"][f"{z}/{x}/{y}"]))
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest + ".png")
+
+    def _store(self, z, x, y, pixels):
+        """
+        Stores a tile under its content hash and links its z/x/y path to it.
+        """
+        data = encode_png(pixels)
+        digest = hashlib.sha256(data).hexdigest()
+        obj = self._object_path(digest)
+        if not os.path.exists(obj):
+            os.makedirs(os.path.dirname(obj), exist_ok=True)
+            with open(obj, "wb") as f:
+                f.write(data)
+        link = os.path.join(self.root, str(z), str(x), f"{y}.png")
+        os.makedirs(os.path.dirname(link), exist_ok=True)
+        if os.path.exists(link):
+            os.remove(link)
+        try:
+            os.link(obj, link)
+        except OSError:
+            shutil.copyfile(obj, link)  # File systems without hard links get a copy
+        self.manifest["tiles"][f"{z}/{x}/{y}"] = digest
+
+    def render_tile(self, z, x, y, **options):
+        """
+        Iterates a tile.
+        :return: Grayscale RGB pixels, row 0 at the top.
+        """
+        size = self.manifest["tile_size"]
+        xmin, xmax, ymin, ymax = self.tile_bounds(z, x, y)
+        step = (xmax - xmin) / size
+        x_range = xmin + (np.arange(size) + 0.5) * step  # Pixel centres
+        y_range = ymax - (np.arange(size) + 0.5) * step  # Top row first
+        counts = escape_counts(x_range, y_range, self.manifest["max_iter"], **options)
+        return counts_to_grayscale(counts, self.manifest["max_iter"])
+
+    def downsample_tile(self, z, x, y):
+        """
+        Builds a tile by averaging 2x2 pixel blocks of its four stored children.
+        :return: RGB pixels, row 0 at the top.
+        """
+        size = self.manifest["tile_size"]
+        mosaic = np.empty((2 * size, 2 * size, 3), dtype=np.uint16)
+        for dy in (0, 1):
+            for dx in (0, 1):
+                mosaic[dy * size:(dy + 1) * size, dx * size:(dx + 1) * size] = \
+                    self.read_tile(z + 1, 2 * x + dx, 2 * y + dy)
+        blocks = mosaic.reshape(size, 2, size, 2, 3).sum(axis=(1, 3))
+        return ((blocks + 2) // 4).astype(np.uint8)
+
+    def level_method(self, z):
+        """
+        :return: "rendered" or "downsampled" for a level that has tiles, None for a new level.
+        """
+        return self.manifest.setdefault("levels", {}).get(str(z))
+
+    def _children(self, x, y):
+        return [(2 * x + dx, 2 * y + dy) for dy in (0, 1) for dx in (0, 1)]
+
+    def _make_tile(self, z, x, y, options):
+        """
+        Stores a missing tile with its level's method, first making any missing children of a downsampled tile.
+        """
+        if self.has_tile(z, x, y):
+            self.stats["skipped"] += 1
+            return
+        method = self.level_method(z) or "rendered"
+        if method == "downsampled":
+            for cx, cy in self._children(x, y):
+                if not self.has_tile(z + 1, cx, cy):
+                    self._make_tile(z + 1, cx, cy, options)
+            self._store(z, x, y, self.downsample_tile(z, x, y))
+        else:
+            self._store(z, x, y, self.render_tile(z, x, y, **options))
+        self.stats[method] += 1
+        self._pending += 1
+        if self._pending >= self._checkpoint:
+            self.save_manifest()
+
+    def build(self, min_level, max_level, region=None, progress=None, checkpoint=64, **options):
+        """
+        Generates every missing tile of the given levels inside a region.
+        A downsampled tile is a 2x2 average of its children rather than a render, so the two
+        methods give slightly different pixels and neighbouring tiles made both ways would meet
+        at a seam. Each level is therefore made one way, recorded in the manifest: the deepest
+        level is iterated, and a shallower level is downsampled (decoding four tiles is far
+        cheaper than iterating one) when the children of all its tiles exist, which is always
+        the case for the whole pyramid. A level whose edge tiles reach past the children built
+        is iterated throughout. Tiles already in the pyramid are never redone, so calling build
+        again with a larger max_level only adds the new level and the missing tiles above it;
+        new tiles of an existing level use that level's method.
+        :param min_level: Shallowest level to generate.
+        :param max_level: Deepest level to generate.
+        :param region: (xmin, xmax, ymin, ymax) to cover, or None for the whole pyramid.
+        :param progress: Optional callback(z, tiles_done, tiles_in_level).
+        :param checkpoint: Number of new tiles between manifest saves, so an interrupted build
+                           loses at most that many.
+        :param options: Options for the escape-time kernel.
+        :return: Counters of rendered, downsampled and skipped tiles.
+        """
+        self._checkpoint = checkpoint
+        for z in range(max_level, min_level - 1, -1):
+            tiles = self.tiles_in_region(z, region)
+            if self.level_method(z) is None:
+                complete = z < max_level and all(self.has_tile(z + 1, cx, cy)
+                                                 for x, y in tiles for cx, cy in self._children(x, y))
+                self.manifest["levels"][str(z)] = "downsampled" if complete else "rendered"
+            for done, (x, y) in enumerate(tiles, 1):
+                self._make_tile(z, x, y, options)
+                if progress is not None:
+                    progress(z, done, len(tiles))
+            self.save_manifest()  # Checkpoint after every level
+        return dict(self.stats)
@@ -0,0 +1,117 @@
+# mariani-silver rectangle subdivision for mandelbrot rendering
+import numpy as np
+from mandelbrot_engine import complex_grid, count_dtype, escape_counts_flat, resolve_backend
+
+
+def _border(rect, width):
+    """
+    Lists the flat pixel indices on the border of a rectangle.
+    :param rect: (row0, row1, col0, col1) half-open rectangle bounds.
+    :param width: Width of the full grid.
+    :return: 1D array of flat indices.
+    """
+    r0, r1, c0, c1 = rect
+    rows = np.arange(r0, r1)
+    cols = np.arange(c0, c1)
+    return np.concatenate((r0 * width + cols, (r1 - 1) * width + cols,
+                           rows * width + c0, rows * width + (c1 - 1)))
+
+
+def _interior(rect, width):
+    """
+    Lists the flat pixel indices strictly inside a rectangle.
+    :param rect: (row0, row1, col0, col1) half-open rectangle bounds.
+    :param width: Width of the full grid.
+    :return: 1D array of flat indices.
+    """
+    r0, r1, c0, c1 = rect
+    rows = np.arange(r0 + 1, r1 - 1)[:, np.newaxis]
+    cols = np.arange(c0 + 1, c1 - 1)[np.newaxis, :]
+    return (rows * width + cols).reshape(-1)
+
+
+def _split(rect):
+    """
+    Splits a rectangle into four quadrants that share their middle row and column,
+    so the split lines become borders of the children.
+    :param rect: (row0, row1, col0, col1) half-open rectangle bounds.
+    :return: List of four child rectangles.
+    """
+    r0, r1, c0, c1 = rect
+    rm = (r0 + r1) // 2
+    cm = (c0 + c1) // 2
+    return [(r0, rm + 1, c0, cm + 1), (r0, rm + 1, cm, c1),
+            (rm, r1, c0, cm + 1), (rm, r1, cm, c1)]
+
+
+def escape_counts_subdivided(x_range, y_range, max_iter, out=None, min_size=8, coverage=None, backend=None,
+                             **options):
+    """
+    Computes escape counts with Mariani-Silver subdivision.
+    Only the border of each rectangle is iterated; if every border pixel has the same
+    count the rectangle is filled with it, otherwise it is split into four and the
+    children are processed the same way. Rectangles are handled level by level so each
+    level's borders are computed in one batch.
+    The fill relies on the set being connected, so it is exact except where a filament thinner
+    than a pixel crosses a border between two samples (a few pixels in a hundred thousand).
+    :param x_range: 1D array of real parts (one per column).
+    :param y_range: 1D array of imaginary parts (one per row).
+    :param max_iter: Maximum number of iterations.
+    :param out: Optional integer array of shape (len(y_range), len(x_range)) to fill.
+    :param min_size: Rectangles with a side at most this long are computed in full instead of split.
+    :param coverage: Optional dictionary that receives pixels_computed, pixels_filled and fraction_iterated.
+    :param backend: Escape-time backend for the border and interior batches (see resolve_backend).
+    :param options: Options for escape_counts_flat (interior_check, periodicity_check, stats).
+    :return: 2D integer array of escape counts.
+    """
+    height, width = len(y_range), len(x_range)
+    if out is None:
+        out = np.empty((height, width), dtype=count_dtype(max_iter))
+    backend = resolve_backend(backend)  # Resolved once rather than for every batch
+    min_size = max(3, min_size)  # A split only makes progress on rectangles at least 3 pixels wide
+    c = complex_grid(x_range, y_range).reshape(-1)
+    counts = np.empty(height * width, dtype=out.dtype)
+    known = np.zeros(height * width, dtype=bool)  # Pixels already computed or filled
+    computed = 0
+
+    def compute(indices):
+        nonlocal computed
+        todo = np.zeros(height * width, dtype=bool)
+        todo[indices] = True
+        indices = np.flatnonzero(todo & ~known)  # Borders shared with a neighbour are computed once
+        if indices.size:
+            counts[indices] = escape_counts_flat(c[indices], max_iter, backend=backend, **options)
+            known[indices] = True
+            computed += indices.size
+
+    rects = [(0, height, 0, width)] if height and width else []
+    while rects:
+        borders = [_border(rect, width) for rect in rects]
+        compute(np.concatenate(borders))
+
+        next_rects = []
+        small = []
+        for rect, border in zip(rects, borders):
+            r0, r1, c0, c1 = rect
+            if r1 - r0 <= 2 or c1 - c0 <= 2:
+                continue  # No interior left once the border is known
+            border = counts[border]
+            if (border == border[0]).all():
+                inside = _interior(rect, width)
+                counts[inside] = border[0]  # Uniform border: the whole rectangle shares its count
+                known[inside] = True
+            elif r1 - r0 <= min_size or c1 - c0 <= min_size:
+                small.append(_interior(rect, width))
+            else:
+                next_rects.extend(_split(rect))
+        if small:
+            compute(np.concatenate(small))
+        rects = next_rects
+
+    out[...] = counts.reshape(height, width)
+    if coverage is not None:
+        total = height * width
+        coverage["pixels_computed"] = computed
+        coverage["pixels_filled"] = total - computed
+        coverage["fraction_iterated"] = computed / total if total else 0.0
+    return out
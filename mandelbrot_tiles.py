@@ -0,0 +1,160 @@
+# multi-core tiled mandelbrot rendering
+import os
+import time
+import numpy as np
+from multiprocessing import get_all_start_methods, get_context
+from multiprocessing.shared_memory import SharedMemory
+from mandelbrot_engine import escape_counts, count_dtype, limit_threads, new_shortcut_stats, resolve_backend
+from mandelbrot_histogram import CountHistogram
+
+# Per-worker state, set once by _init_worker so tiles only carry their bounds
+_worker = {}
+
+
+def make_tiles(height, width, tile_size=64):
+    """
+    Splits a (height, width) grid into rectangular tiles.
+    :param height: Number of rows in the grid.
+    :param width: Number of columns in the grid.
+    :param tile_size: Edge length of a tile in pixels (edge tiles may be smaller).
+    :return: List of (row0, row1, col0, col1) tile bounds.
+    """
+    return [(r, min(r + tile_size, height), c, min(c + tile_size, width))
+            for r in range(0, height, tile_size)
+            for c in range(0, width, tile_size)]
+
+
+def pool_context():
+    """
+    Picks how pool workers are started.
+    Forked workers would inherit the thread pool of any parallel numba kernel the parent has run
+    (GNU OpenMP aborts them, TBB hangs the interpreter at exit), so workers start from a clean
+    process instead: a fork server where the platform has one, otherwise spawn.
+    :return: multiprocessing context.
+    """
+    if "forkserver" in get_all_start_methods():
+        context = get_context("forkserver")
+        context.set_forkserver_preload([__name__])  # The server imports NumPy and the kernels once for all workers
+        return context
+    return get_context("spawn")
+
+
+def _init_worker(shm_name, shape, dtype, x_range, y_range, max_iter, backend, options, histogram):
+    """
+    Attaches a pool worker to the shared framebuffer and stores the view parameters.
+    """
+    shm = SharedMemory(name=shm_name)
+    _worker["shm"] = shm  # Keep a reference so the mapping stays alive
+    _worker["framebuffer"] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    _worker["x_range"] = x_range
+    _worker["y_range"] = y_range
+    _worker["max_iter"] = max_iter
+    _worker["backend"] = backend
+    _worker["options"] = options
+    _worker["histogram"] = histogram
+    limit_threads(backend)  # One process per core already; threaded kernels would oversubscribe
+
+
+def _render_tile(tile):
+    """
+    Renders one tile straight into the shared framebuffer.
+    :param tile: (row0, row1, col0, col1) tile bounds.
+    :return: (tile, seconds, iterations, shortcuts, histogram) cost record, where histogram is the tile's
+             CountHistogram (or None when not requested); the pixels themselves are not sent back.
+    """
+    r0, r1, c0, c1 = tile
+    shortcuts = new_shortcut_stats()
+    start = time.perf_counter()
+    counts = escape_counts(_worker["x_range"][c0:c1], _worker["y_range"][r0:r1], _worker["max_iter"],
+                           backend=_worker["backend"], out=_worker["framebuffer"][r0:r1, c0:c1],
+                           stats=shortcuts, **_worker["options"])
+    seconds = time.perf_counter() - start
+    histogram = CountHistogram(_worker["max_iter"]).update(counts) if _worker["histogram"] else None
+    return tile, seconds, int(counts.sum(dtype=np.int64)), shortcuts, histogram
+
+
+def render_parallel(x_range, y_range, max_iter, tile_size=64, workers=None, backend=None, histogram=None,
+                    **options):
+    """
+    Computes escape counts for a grid on a process pool.
+    Tiles are handed out one at a time as workers become free, so a few expensive
+    tiles inside the set do not hold up the cheap ones.
+    :param x_range: 1D array of real parts (one per column).
+    :param y_range: 1D array of imaginary parts (one per row).
+    :param max_iter: Maximum number of iterations.
+    :param tile_size: Edge length of a tile in pixels.
+    :param workers: Number of worker processes (defaults to the CPU count).
+    :param backend: Escape-time backend used by the workers (see resolve_backend).
+    :param histogram: Optional CountHistogram that every tile's counts are merged into as the tile finishes.
+    :param options: Backend options forwarded to every tile (e.g. interior_check).
+    :return: (counts, stats) where counts is a 2D unsigned integer array and stats holds per-tile costs.
+    """
+    x_range = np.asarray(x_range, dtype=np.float64)
+    y_range = np.asarray(y_range, dtype=np.float64)
+    shape = (len(y_range), len(x_range))
+    dtype = np.dtype(count_dtype(max_iter))
+    workers = workers or os.cpu_count() or 1
+    backend = resolve_backend(backend)  # Resolved once so every worker uses the same backend
+    tiles = make_tiles(shape[0], shape[1], tile_size)
+
+    shm = SharedMemory(create=True, size=max(1, int(np.prod(shape)) * dtype.itemsize))
+    try:
+        start = time.perf_counter()
+        with pool_context().Pool(workers, initializer=_init_worker,
+                  initargs=(shm.name, shape, dtype, x_range, y_range, max_iter, backend, options,
+                            histogram is not None)) as pool:
+            # chunksize=1 gives dynamic scheduling: each worker pulls the next tile when it is done
+            records = []
+            for *record, partial in pool.imap_unordered(_render_tile, tiles, chunksize=1):
+                records.append(record)
+                if histogram is not None:
+                    histogram.merge(partial)  # Merged and dropped straight away, so memory does not grow with tiles
+            pool.close()
+            pool.join()  # Let the workers exit on their own rather than being terminated by the with block
+        elapsed = time.perf_counter() - start
+        counts = np.ndarray(shape, dtype=dtype, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+
+    shortcuts = new_shortcut_stats()
+    for _, _, _, tile_shortcuts in records:
+        for key in shortcuts:
+            shortcuts[key] += tile_shortcuts.get(key, 0)
+
+    stats = {
+        "workers": workers,
+        "elapsed": elapsed,
+        "tiles": [record[0] for record in records],
+        "tile_seconds": np.array([record[1] for record in records]),
+        "tile_iterations": np.array([record[2] for record in records], dtype=np.int64),
+        "shortcuts": shortcuts,
+    }
+    return counts, stats
+
+
+def cost_histogram(stats, bins=10):
+    """
+    Builds a histogram of per-tile render times.
+    :param stats: Stats dictionary returned by render_parallel.
+    :param bins: Number of histogram bins.
+    :return: (tile_counts, bin_edges) as returned by numpy.histogram.
+    """
+    return np.histogram(stats["tile_seconds"], bins=bins)
+
+
+def format_cost_histogram(stats, bins=10, bar_width=40):
+    """
+    Formats the per-tile cost histogram as text.
+    :param stats: Stats dictionary returned by render_parallel.
+    :param bins: Number of histogram bins.
+    :param bar_width: Width of the longest bar in characters.
+    :return: Multi-line string.
+    """
+    tile_counts, edges = cost_histogram(stats, bins)
+    peak = max(1, tile_counts.max())
+    lines = [f"{len(stats['tiles'])} tiles on {stats['workers']} workers in {stats['elapsed']:.3f}s"]
+    for n, lo, hi in zip(tile_counts, edges[:-1], edges[1:]):
+        bar = "#" * int(round(n * bar_width / peak))
+        lines.append(f"{lo * 1000:9.2f}-{hi * 1000:9.2f} ms | {n:5d} {bar}")
+    return "\n".join(lines)
@@ -0,0 +1,25 @@
+# access to the OpenGL-free modules of the MandelBrot-set viewer (cpu_render, telemetry)
+import importlib.util
+import os
+import sys
+
+# Directory of mandelbrot.py and its helper modules (not a package: the name has a hyphen)
+VIEWER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "MandelBrot-set")
+
+
+def load_viewer_module(name):
+    """
+    Imports one module of the MandelBrot-set viewer without putting its directory on sys.path,
+    so none of the viewer's modules can shadow installed modules of the same name.
+    The module is registered as mandelbrot_viewer_<name>, so loading it twice returns the same module.
+    :param name: Module name inside MandelBrot-set (e.g. "cpu_render").
+    :return: The module.
+    """
+    qualified = f"mandelbrot_viewer_{name}"
+    module = sys.modules.get(qualified)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(qualified, os.path.join(VIEWER_DIR, name + ".py"))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[qualified] = module  # Registered first, as the import system does, for pickling and cycles
+        spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,78 @@
+# minimal PNG writer (no imaging library needed)
+import struct
+import zlib
+import numpy as np
+
+
+def _chunk(kind, data):
+    """
+    Builds one PNG chunk (length, type, data, CRC).
+    """
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+def encode_png(pixels, level=6):
+    """
+    Encodes an RGB or grayscale image as PNG bytes.
+    :param pixels: uint8 array of shape (height, width, 3) or (height, width); row 0 is the top.
+    :param level: zlib compression level.
+    :return: PNG file contents.
+    """
+    pixels = np.ascontiguousarray(pixels, dtype=np.uint8)
+    height, width = pixels.shape[:2]
+    color_type = 2 if pixels.ndim == 3 else 0  # Truecolor or grayscale
+    rows = pixels.reshape(height, -1)
+    # Every scanline starts with filter type 0 (None)
+    raw = np.hstack((np.zeros((height, 1), dtype=np.uint8), rows)).tobytes()
+    header = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + _chunk(b"IHDR", header)
+            + _chunk(b"IDAT", zlib.compress(raw, level)) + _chunk(b"IEND", b""))
+
+
+def write_png(path, pixels, level=6):
+    """
+    Writes an RGB or grayscale image to a PNG file.
+    :param path: Output file path.
+    :param pixels: uint8 array of shape (height, width, 3) or (height, width); row 0 is the top.
+    :param level: zlib compression level.
+    """
+    with open(path, "wb") as f:
+        f.write(encode_png(pixels, level))
+
+
+def decode_png(data):
+    """
+    Decodes PNG bytes written by encode_png (8-bit RGB or grayscale, unfiltered scanlines).
+    :param data: PNG file contents.
+    :return: uint8 array of shape (height, width, 3) or (height, width); row 0 is the top.
+    """
+    if data[:8] != b"\x89PNG\r\n\x1a\n":
+        raise ValueError("Not a PNG file")
+    pos = 8
+    idat = []
+    while pos < len(data):
+        length, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        if kind == b"IHDR":
+            width, height, depth, color_type = struct.unpack(">IIBB", body[:10])
+        elif kind == b"IDAT":
+            idat.append(body)
+        pos += 12 + length
+    if depth != 8 or color_type not in (0, 2):
+        raise ValueError("Only 8-bit RGB and grayscale PNGs are supported")
+    channels = 3 if color_type == 2 else 1
+    raw = np.frombuffer(zlib.decompress(b"".join(idat)), dtype=np.uint8).reshape(height, 1 + width * channels)
+    if raw[:, 0].any():
+        raise ValueError("Filtered scanlines are not supported")
+    pixels = raw[:, 1:].reshape((height, width, 3) if channels == 3 else (height, width))
+    return pixels.copy()
+
+
+def read_png(path):
+    """
+    Reads a PNG file written by write_png.
+    :param path: Input file path.
+    :return: uint8 array of shape (height, width, 3) or (height, width); row 0 is the top.
+    """
+    with open(path, "rb") as f:
+        return decode_png(f.read())
@@ -0,0 +1,133 @@
+# headless mandelbrot renderer (no OpenGL, no window)
+import argparse
+import sys
+import time
+import numpy as np
+from mandelbrot_engine import escape_counts, new_shortcut_stats, check_backends
+from mandelbrot_tiles import render_parallel
+from mandelbrot_color import PALETTES, apply_palette, make_palette
+from mandelbrot_histogram import CountHistogram
+from mandelbrot_subdivision import escape_counts_subdivided
+from mandelbrot_viewer import load_viewer_module
+from png_writer import write_png
+
+# The shader-view CPU renderer lives next to mandelbrot.py
+cpu_render = load_viewer_module("cpu_render")
+
+
+def render_bounds(args):
+    """
+    Renders the a.py view (xmin..ymax bounds, escape time through a palette).
+    :param args: Parsed command-line arguments.
+    :return: (counts, pixels, iterations) with row 0 at the bottom of the view.
+    """
+    x_range = np.linspace(args.xmin, args.xmax, args.width)
+    y_range = np.linspace(args.ymin, args.ymax, args.height)
+    shortcuts = new_shortcut_stats()
+    histogram = CountHistogram(args.max_iter)
+    if args.mode == "subdivide":
+        coverage = {}
+        counts = escape_counts_subdivided(x_range, y_range, args.max_iter, coverage=coverage, backend=args.backend,
+                                          stats=shortcuts)
+        print(f"Subdivision iterated {coverage['fraction_iterated']:.1%} of the pixels")
+    elif args.workers > 1:
+        counts, stats = render_parallel(x_range, y_range, args.max_iter, workers=args.workers, backend=args.backend,
+                                        histogram=histogram if args.equalize else None)
+        shortcuts = stats["shortcuts"]
+    else:
+        counts = escape_counts(x_range, y_range, args.max_iter, backend=args.backend, stats=shortcuts)
+    iterations = shortcuts["iterations"]
+    lut = make_palette(args.palette, args.max_iter)
+    if args.equalize:
+        if not histogram.total():
+            histogram.update(counts)  # Tiled renders have already streamed their counts in
+        lut = histogram.equalized_palette(lut)
+    return counts, apply_palette(counts, lut), iterations
+
+
+def render_center(args):
+    """
+    Renders the mandelbrot.py view (pos_x/pos_y/zoom, smooth hue colouring).
+    :param args: Parsed command-line arguments.
+    :return: (counts, pixels, iterations) with row 0 at the bottom of the view.
+    """
+    state = {"pos_x": args.center[0], "pos_y": args.center[1], "zoom": args.zoom, "max_iters": args.max_iter}
+    escape = cpu_render.EscapeState(cpu_render.view_points(state, args.width, args.height))
+    iters, fraction = escape.result(args.max_iter)
+    return iters, cpu_render.shade(iters, fraction, args.max_iter), escape.stats["iterations"]
+
+
+def parse_args(argv=None):
+    """
+    Parses the command line.
+    :param argv: Argument list (defaults to sys.argv[1:]).
+    :return: argparse.Namespace.
+    """
+    parser = argparse.ArgumentParser(description="Render the Mandelbrot set to PNG and/or .npy without a window.")
+    parser.add_argument("output", nargs="?", help="Output path without extension")
+    parser.add_argument("--format", choices=("png", "npy", "both"), default="png", help="What to write")
+    parser.add_argument("--width", type=int, default=800)
+    parser.add_argument("--height", type=int, default=800)
+    parser.add_argument("--max-iter", type=int, default=256, help="Iteration limit (max_iter / max_iters)")
+    parser.add_argument("--bounds", type=float, nargs=4, metavar=("XMIN", "XMAX", "YMIN", "YMAX"),
+                        help="a.py view bounds (default -2 1 -1.5 1.5)")
+    parser.add_argument("--center", type=float, nargs=2, metavar=("POS_X", "POS_Y"),
+                        help="mandelbrot.py view centre (switches to that view and colouring)")
+    parser.add_argument("--zoom", type=float, default=1.0, help="mandelbrot.py zoom (with --center)")
+    parser.add_argument("--mode", choices=("full", "subdivide"), default="full", help="a.py render mode")
+    parser.add_argument("--workers", type=int, default=1, help="Processes for tiled a.py renders")
+    parser.add_argument("--palette", choices=tuple(PALETTES), default="grayscale", help="a.py palette")
+    parser.add_argument("--equalize", action="store_true", help="Histogram-equalize the a.py palette")
+    parser.add_argument("--backend", help="a.py escape-time backend (python, numpy, numba or auto; "
+                                           "defaults to $MANDELBROT_BACKEND, then auto)")
+    parser.add_argument("--self-check", action="store_true",
+                        help="Compare every available backend with the reference and exit")
+    args = parser.parse_args(argv)
+    if args.output is None and not args.self_check:
+        parser.error("an output path is required")
+    for option in ("width", "height"):
+        if getattr(args, option) < 1:
+            parser.error(f"--{option} must be a positive number of pixels")
+    # Options the chosen view or mode would silently ignore
+    if args.center is not None:
+        unused, context = ["--bounds", "--mode", "--workers", "--palette", "--equalize", "--backend"], "--center"
+    elif args.mode == "subdivide":
+        unused, context = ["--zoom", "--workers"], "--mode subdivide"
+    else:
+        unused, context = ["--zoom"], "the a.py view (without --center)"
+    unused = [option for option in unused if getattr(args, option[2:]) != parser.get_default(option[2:])]
+    if unused:
+        parser.error(f"{', '.join(unused)} not used with {context}")
+    args.xmin, args.xmax, args.ymin, args.ymax = args.bounds or (-2.0, 1.0, -1.5, 1.5)
+    return args
+
+
+def main(argv=None):
+    """
+    Renders one image and prints throughput figures.
+    """
+    args = parse_args(argv)
+    if args.self_check:
+        mismatches = check_backends()
+        for name, count in mismatches.items():
+            print(f"{name:8s} {'ok' if count == 0 else f'{count} pixels differ'}")
+        sys.exit(1 if any(mismatches.values()) else 0)
+    start = time.perf_counter()
+    if args.center is not None:
+        counts, pixels, iterations = render_center(args)
+    else:
+        counts, pixels, iterations = render_bounds(args)
+    elapsed = time.perf_counter() - start
+
+    if args.format in ("png", "both"):
+        write_png(args.output + ".png", np.flipud(pixels))  # Images store the top row first
+    if args.format in ("npy", "both"):
+        np.save(args.output + ".npy", counts)
+
+    megapixels = args.width * args.height / 1e6
+    print(f"{args.width}x{args.height} in {elapsed:.3f}s: {megapixels / elapsed:.2f} Mpixels/s, "
+          f"{iterations} iterations ({iterations / elapsed / 1e6:.1f} M/s)")
+
+
+if __name__ == "__main__":
+    main()
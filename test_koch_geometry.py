@@ -0,0 +1,34 @@
+# checks of the NumPy Koch snowflake against the recursive construction of b.py
+import numpy as np
+import pytest
+from koch_geometry import TRIANGLE, KochCache, koch_segments_recursive, koch_vertices
+
+
+def recursive_vertices(order, corners=TRIANGLE):
+    """
+    :return: Start point of every segment of the recursive snowflake, in drawing order.
+    """
+    segments = []
+    for i in range(3):  # The three sides of the triangle, in the order b.py draws them
+        koch_segments_recursive(order, corners[i], corners[(i + 1) % 3], segments)
+    return np.array([start for start, _ in segments])
+
+
+@pytest.mark.parametrize("order", range(8))
+def test_koch_vertices_match_recursion(order):
+    assert np.allclose(koch_vertices(order), recursive_vertices(order), atol=1e-6)
+
+
+def test_koch_cache_matches_koch_vertices():
+    cache = KochCache()
+    for order in list(range(8)) + [3, 7, 5]:  # Stepping up one order at a time, then cached orders
+        assert np.allclose(cache.vertices(order), koch_vertices(order), atol=1e-6)
+    assert cache.stats()["hits"] == 3
+
+
+def test_koch_cache_rebuilds_evicted_orders():
+    cache = KochCache(max_bytes=24 * 3 * 4 ** 5)  # Room for order 5 and little else
+    for order in [5, 2, 6, 5, 0, 3]:
+        assert np.allclose(cache.vertices(order), koch_vertices(order), atol=1e-6)
+    assert cache.stats()["evictions"] > 0
+    assert cache.bytes() <= cache.max_bytes
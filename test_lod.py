@@ -0,0 +1,26 @@
+# checks of the level-of-detail helpers against the recursive drawers' rule
+import pytest
+from lod import lod_refinements, pixels_per_unit
+
+
+def refinements_recursive(length, ratio, refinements, scale, min_pixels):
+    """Refines one primitive like draw_branch: children only while the parent reaches min_pixels."""
+    if refinements == 0 or length * max(scale) < min_pixels:
+        return 0
+    return 1 + refinements_recursive(length * ratio, ratio, refinements - 1, scale, min_pixels)
+
+
+@pytest.mark.parametrize("viewport", [(800, 800), (200, 200), (1600, 400)])
+@pytest.mark.parametrize("length, ratio", [(0.5, 0.67), (1.0, 1 / 3)])
+def test_refinements_match_recursion(viewport, length, ratio):
+    scale = pixels_per_unit(*viewport)
+    for refinements in range(12):
+        assert lod_refinements(length, ratio, refinements, scale, 1.0) == \
+            refinements_recursive(length, ratio, refinements, scale, 1.0)
+
+
+def test_last_level_is_under_the_threshold():
+    scale = pixels_per_unit(800, 800)
+    count = lod_refinements(1.0, 1 / 3, 20, scale, 1.0)
+    assert count < 20
+    assert 400 * 3 ** -count < 1.0 <= 400 * 3 ** -(count - 1)
@@ -0,0 +1,48 @@
+# checks of adaptive supersampling against its sample cap and iteration budget
+import numpy as np
+import pytest
+from mandelbrot_antialias import render_antialiased
+from mandelbrot_color import apply_palette, grayscale_palette
+from mandelbrot_engine import escape_counts
+
+X_RANGE = np.linspace(-0.76, -0.72, 90)  # Seahorse valley, mostly boundary
+Y_RANGE = np.linspace(0.08, 0.12, 90)
+
+
+def test_cap_of_one_keeps_the_single_sample_render():
+    stats = {}
+    pixels = render_antialiased(X_RANGE, Y_RANGE, 200, max_samples=1, stats=stats)
+    assert stats["refined"] == 0
+    assert stats["cost"] == 1.0
+    assert np.array_equal(pixels, apply_palette(escape_counts(X_RANGE, Y_RANGE, 200), grayscale_palette(200)))
+
+
+@pytest.mark.parametrize("max_samples", [2, 3, 4, 5, 9, 16])
+def test_samples_stay_within_the_cap(max_samples):
+    stats = {}
+    render_antialiased(X_RANGE, Y_RANGE, 200, max_samples=max_samples, max_cost=100.0, stats=stats)
+    assert stats["refined"] > 0
+    assert stats["cost"] <= max_samples
+    assert stats["samples"] <= stats["pixels"] + stats["refined"] * (max_samples - 1)
+
+
+@pytest.mark.parametrize("max_cost", [1.5, 2.0, 3.0])
+def test_iterations_stay_within_the_budget(max_cost):
+    stats = {}
+    render_antialiased(X_RANGE, Y_RANGE, 200, max_cost=max_cost, stats=stats)
+    assert stats["refined"] > 0
+    assert stats["iteration_cost"] <= max_cost * 1.1  # The budget is planned from estimated sample costs
+
+
+def test_flat_view_is_not_refined():
+    x_range = np.linspace(-0.3, -0.1, 40)  # Inside the main cardioid
+    y_range = np.linspace(-0.1, 0.1, 40)
+    stats = {}
+    pixels = render_antialiased(x_range, y_range, 100, stats=stats)
+    assert stats["refined"] == 0
+    assert np.array_equal(pixels, apply_palette(escape_counts(x_range, y_range, 100), grayscale_palette(100)))
+
+
+def test_same_seed_gives_the_same_image():
+    first = render_antialiased(X_RANGE, Y_RANGE, 200, seed=3)
+    assert np.array_equal(first, render_antialiased(X_RANGE, Y_RANGE, 200, seed=3))
@@ -0,0 +1,36 @@
+# checks of the escape-count LRU cache
+import numpy as np
+import pytest
+from mandelbrot_cache import CountCache
+
+
+def test_count_cache_evicts_least_recently_used():
+    cache = CountCache(max_bytes=3 * 800)
+    arrays = {key: np.full(100, key, dtype=np.int64) for key in range(4)}  # 800 bytes each
+    for key in range(3):
+        cache.put(key, arrays[key])
+    assert cache.get(0) is not None  # 1 is now the least recently used
+    cache.put(3, arrays[3])
+    assert cache.get(1) is None
+    for key in (0, 2, 3):
+        assert np.array_equal(cache.get(key), arrays[key])
+    stats = cache.stats()
+    assert (stats["evictions"], stats["entries"], stats["bytes"]) == (1, 3, 3 * 800)
+
+
+def test_count_cache_entries_are_read_only():
+    cache = CountCache(max_bytes=800)
+    counts = np.zeros(100, dtype=np.int64)
+    cache.put("view", counts)
+    with pytest.raises(ValueError):
+        cache.get("view")[0] = 1
+    counts[0] = 1  # The caller's array is copied, not frozen
+    assert cache.get("view")[0] == 0
+
+
+def test_count_cache_skips_arrays_over_budget():
+    cache = CountCache(max_bytes=800)
+    cache.put("small", np.zeros(100, dtype=np.int64))
+    cache.put("large", np.zeros(101, dtype=np.int64))
+    assert cache.get("large") is None
+    assert cache.stats()["entries"] == 1
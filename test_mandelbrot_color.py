@@ -0,0 +1,25 @@
+# checks of palette recoloring
+import numpy as np
+import pytest
+from mandelbrot_color import apply_palette, make_palette
+
+
+@pytest.mark.parametrize("name", ["grayscale", "hue", "fire"])
+def test_smooth_coloring_blends_neighbouring_entries(name):
+    max_iter = 200
+    lut = make_palette(name, max_iter)
+    rng = np.random.default_rng(1)
+    counts = rng.integers(0, max_iter + 1, (40, 50)).astype(np.uint16)
+    fraction = rng.uniform(-0.5, 1.0, counts.shape).astype(np.float32)  # Far escapes have negative fractions
+
+    # Blend in float64 straight from the definition: position count + fraction, kept below the set's entry
+    position = np.clip(counts + fraction.astype(np.float64), 0, max_iter - 1)
+    low = position.astype(int)
+    weight = (position - low)[..., np.newaxis]
+    expected = lut[low] * (1 - weight) + lut[np.minimum(low + 1, max_iter - 1)] * weight
+    expected[counts == max_iter] = lut[max_iter]
+
+    colors = apply_palette(counts, lut, fraction=fraction)
+    largest_step = np.abs(np.diff(lut[:max_iter].astype(int), axis=0)).max()
+    assert np.abs(colors - expected).max() <= largest_step / 32 + 0.5  # Half a table step, then rounding
+    assert np.array_equal(colors[counts == max_iter], np.broadcast_to(lut[max_iter], colors[counts == max_iter].shape))
@@ -0,0 +1,41 @@
+# checks of the escape-count backends against the per-pixel reference escape_time
+import numpy as np
+import pytest
+from mandelbrot_engine import BACKENDS, escape_counts, escape_counts_flat, escape_time
+
+# Views with escaping points, interior points and boundary detail: full set, seahorse valley, needle
+VIEWS = [(-2.0, 1.0, -1.5, 1.5), (-0.75, -0.74, 0.1, 0.11), (-1.8, -1.7, -0.05, 0.05)]
+MAX_ITER = 300
+SIZE = 24
+
+
+def view_ranges(view, size=SIZE):
+    """
+    :return: (x_range, y_range) of a size x size grid over the view (xmin, xmax, ymin, ymax).
+    """
+    xmin, xmax, ymin, ymax = view
+    return np.linspace(xmin, xmax, size), np.linspace(ymin, ymax, size)
+
+
+def reference_counts(x_range, y_range, max_iter):
+    """
+    :return: Escape counts of the grid computed with escape_time, one pixel at a time.
+    """
+    return np.array([[escape_time(x, y, max_iter) for x in x_range] for y in y_range])
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+@pytest.mark.parametrize("view", VIEWS)
+def test_backend_matches_escape_time(backend, view):
+    x_range, y_range = view_ranges(view)
+    reference = reference_counts(x_range, y_range, MAX_ITER)
+    assert np.array_equal(escape_counts(x_range, y_range, MAX_ITER, backend=backend), reference)
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+@pytest.mark.parametrize("view", VIEWS)
+def test_flat_backend_matches_escape_time(backend, view):
+    x_range, y_range = view_ranges(view)
+    reference = reference_counts(x_range, y_range, MAX_ITER)
+    c = (x_range[np.newaxis, :] + 1j * y_range[:, np.newaxis]).reshape(-1)
+    assert np.array_equal(escape_counts_flat(c, MAX_ITER, backend=backend), reference.reshape(-1))
@@ -0,0 +1,42 @@
+# checks of the memory-mapped out-of-core renderer
+import numpy as np
+import pytest
+from mandelbrot_engine import counts_to_grayscale, escape_counts_python
+from mandelbrot_outofcore import band_rows, render_to_file
+
+BOUNDS = (-2.0, 1.0, -1.5, 1.5)
+
+
+class Interrupted(Exception):
+    pass
+
+
+def reference_image(width, height, max_iter):
+    x_range = np.linspace(BOUNDS[0], BOUNDS[1], width)
+    y_range = np.linspace(BOUNDS[2], BOUNDS[3], height)
+    return counts_to_grayscale(escape_counts_python(x_range, y_range, max_iter), max_iter)
+
+
+def test_render_to_file_matches_reference(tmp_path):
+    path = str(tmp_path / "view.npy")
+    render_to_file(path, *BOUNDS, 40, 30, 100, memory_limit=4 * 40 * 163)
+    assert np.array_equal(np.load(path), reference_image(40, 30, 100))
+
+
+def test_render_to_file_resumes(tmp_path):
+    width, height, max_iter = 40, 30, 100
+    memory_limit = 4 * width * 163  # Four rows per band
+    assert band_rows(width, memory_limit) == 4
+    path = str(tmp_path / "view.npy")
+
+    def stop_after_two_bands(rows_done, total):
+        if rows_done == 8:
+            raise Interrupted
+
+    with pytest.raises(Interrupted):
+        render_to_file(path, *BOUNDS, width, height, max_iter, memory_limit, progress=stop_after_two_bands)
+    resumed = []
+    render_to_file(path, *BOUNDS, width, height, max_iter, memory_limit,
+                   progress=lambda rows_done, total: resumed.append(rows_done))
+    assert resumed[0] == 12  # The first two bands were not rendered again
+    assert np.array_equal(np.load(path), reference_image(width, height, max_iter))
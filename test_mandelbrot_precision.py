@@ -0,0 +1,39 @@
+# checks of the precision tiers against float64 renders and below float64 resolution
+import numpy as np
+import pytest
+from mandelbrot_engine import BACKENDS, escape_counts
+from mandelbrot_precision import choose_tier, escape_counts_double_double, escape_counts_tiered
+
+# c = i lies on the boundary (its orbit is preperiodic), so pixels around it keep different counts at any depth
+BOUNDARY = (0.0, 1.0)
+
+
+def test_tiers_follow_the_span():
+    assert choose_tier(-0.5, 0.0, 3.0, 3.0, 800, 800) == "float32"
+    assert choose_tier(*BOUNDARY, 1e-9, 1e-9, 800, 800) == "float64"
+    assert choose_tier(*BOUNDARY, 1e-18, 1e-18, 800, 800) == "double-double"
+
+
+def test_double_double_matches_float64_on_a_shallow_view():
+    x_range = np.linspace(-2.0, 1.0, 61)
+    y_range = np.linspace(-1.5, 1.5, 41)
+    counts = escape_counts_double_double(-0.5, 0.0, 3.0, 3.0, 61, 41, 200)
+    reference = escape_counts(x_range, y_range, 200, backend="numpy")
+    assert np.mean(counts != reference) < 0.01  # Pixel coordinates round differently from np.linspace
+
+
+def test_double_double_resolves_a_view_below_float64_spacing():
+    span = 1e-18  # Far below the float64 spacing of about 1e-16 at the centre
+    info = {}
+    counts = escape_counts_tiered(*BOUNDARY, span, span, 16, 16, 1000, info=info)
+    assert info["tier"] == "double-double"
+    assert len(np.unique(counts)) > 10
+    assert np.any(counts[:, 0] != counts[:, -1])  # Float64 bounds would put both edges on the same point
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_float32_downgrade_is_recorded(backend):
+    info = {}
+    escape_counts_tiered(-0.5, 0.0, 3.0, 3.0, 40, 40, 100, backend=backend, info=info)
+    assert info["chosen_tier"] == "float32"
+    assert info["tier"] == ("float32" if backend == "numpy" else "float64")
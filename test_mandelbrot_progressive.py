@@ -0,0 +1,29 @@
+# checks of coarse-to-fine rendering against the reference backend
+import numpy as np
+import pytest
+from mandelbrot_engine import BACKENDS, escape_counts_python, new_shortcut_stats
+from mandelbrot_progressive import progressive_counts
+
+X_RANGE = np.linspace(-2.0, 1.0, 83)
+Y_RANGE = np.linspace(-1.5, 1.5, 61)
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_last_pass_matches_reference(backend):
+    passes = list(progressive_counts(X_RANGE, Y_RANGE, 200, start_stride=16, backend=backend))
+    assert [stride for stride, _ in passes] == [16, 8, 4, 2, 1]
+    assert np.array_equal(passes[-1][1], escape_counts_python(X_RANGE, Y_RANGE, 200))
+
+
+def test_passes_sample_the_exact_counts():
+    reference = escape_counts_python(X_RANGE, Y_RANGE, 200)
+    for stride, counts in progressive_counts(X_RANGE, Y_RANGE, 200, start_stride=8, backend="numpy"):
+        assert counts.shape == reference.shape
+        assert np.array_equal(counts[::stride, ::stride], reference[::stride, ::stride])
+
+
+def test_every_pixel_is_iterated_once():
+    stats = new_shortcut_stats()
+    for _ in progressive_counts(X_RANGE, Y_RANGE, 200, start_stride=16, backend="python", stats=stats):
+        pass
+    assert stats["iterations"] == escape_counts_python(X_RANGE, Y_RANGE, 200).sum()
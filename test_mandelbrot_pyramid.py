@@ -0,0 +1,62 @@
+# checks that every pyramid level is made one way and that builds checkpoint as they go
+import numpy as np
+import pytest
+from mandelbrot_pyramid import TilePyramid
+
+REGION = (-0.8, -0.6, 0.0, 0.2)  # Crosses tile edges at every level
+
+
+def assert_levels_match_methods(pyramid):
+    for key in pyramid.manifest["tiles"]:
+        z, x, y = map(int, key.split("/"))
+        if pyramid.level_method(z) == "rendered":
+            expected = pyramid.render_tile(z, x, y)
+        else:
+            expected = pyramid.downsample_tile(z, x, y)
+        assert np.array_equal(pyramid.read_tile(z, x, y), expected), key
+
+
+def test_whole_pyramid_downsamples_above_the_deepest_level(tmp_path):
+    pyramid = TilePyramid(str(tmp_path), tile_size=16, max_iter=64)
+    stats = pyramid.build(0, 3)
+    assert pyramid.manifest["levels"] == {"3": "rendered", "2": "downsampled", "1": "downsampled",
+                                          "0": "downsampled"}
+    assert stats == {"rendered": 64, "downsampled": 16 + 4 + 1, "skipped": 0}
+    assert_levels_match_methods(pyramid)
+
+
+def test_region_levels_without_all_children_are_rendered_throughout(tmp_path):
+    pyramid = TilePyramid(str(tmp_path), tile_size=16, max_iter=64)
+    pyramid.build(0, 3, region=REGION)
+    assert set(pyramid.manifest["levels"].values()) == {"rendered"}
+    assert_levels_match_methods(pyramid)
+
+
+def test_new_tiles_use_their_level_method(tmp_path):
+    pyramid = TilePyramid(str(tmp_path), tile_size=16, max_iter=64)
+    pyramid.build(0, 2, region=REGION)
+    pyramid.build(0, 3)  # Levels 0-2 stay rendered; the new level 3 is rendered
+    assert set(pyramid.manifest["levels"].values()) == {"rendered"}
+    assert_levels_match_methods(pyramid)
+
+    pyramid = TilePyramid(str(tmp_path / "second"), tile_size=16, max_iter=64)
+    pyramid.build(1, 2, region=(-2.4, -0.6, 0.1, 1.9))  # The top left tile of level 1, with all its children
+    assert pyramid.level_method(1) == "downsampled"
+    pyramid.build(1, 1)  # Missing children of downsampled tiles are made first
+    assert len([key for key in pyramid.manifest["tiles"] if key.startswith("2/")]) == 16
+    assert_levels_match_methods(pyramid)
+
+
+def test_interrupted_build_keeps_its_checkpoints(tmp_path):
+    def stop(z, done, total):
+        if done == 20:
+            raise KeyboardInterrupt
+
+    pyramid = TilePyramid(str(tmp_path), tile_size=8, max_iter=32)
+    with pytest.raises(KeyboardInterrupt):
+        pyramid.build(0, 3, progress=stop, checkpoint=8)
+    reopened = TilePyramid(str(tmp_path))
+    assert len(reopened.manifest["tiles"]) == 16  # Two checkpoints of eight tiles
+    stats = reopened.build(0, 3)
+    assert stats["skipped"] == 16
+    assert len(reopened.manifest["tiles"]) == 64 + 16 + 4 + 1
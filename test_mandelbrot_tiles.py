@@ -0,0 +1,29 @@
+# checks of the shared-memory tiled renderer against the reference backend
+import numpy as np
+import pytest
+from mandelbrot_engine import escape_counts_python
+from mandelbrot_histogram import CountHistogram
+from mandelbrot_tiles import make_tiles, render_parallel
+
+
+def test_tiles_cover_the_image_once():
+    coverage = np.zeros((70, 45), dtype=int)
+    for r0, r1, c0, c1 in make_tiles(70, 45, tile_size=16):
+        coverage[r0:r1, c0:c1] += 1
+    assert (coverage == 1).all()
+
+
+@pytest.mark.parametrize("backend", ["numpy", "auto"])
+def test_render_parallel_matches_reference(backend):
+    x_range = np.linspace(-2.0, 1.0, 70)
+    y_range = np.linspace(-1.5, 1.5, 45)
+    histogram = CountHistogram(200)
+    counts, stats = render_parallel(x_range, y_range, 200, tile_size=16, workers=2, backend=backend,
+                                    histogram=histogram)
+    reference = escape_counts_python(x_range, y_range, 200)
+    assert np.array_equal(counts, reference)
+    assert len(stats["tiles"]) == len(make_tiles(45, 70, 16))
+
+    expected = CountHistogram(200)
+    expected.update(reference)
+    assert np.array_equal(histogram.bins, expected.bins)
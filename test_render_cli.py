@@ -0,0 +1,16 @@
+# checks of the render CLI's argument validation
+import pytest
+from render_cli import parse_args
+
+
+@pytest.mark.parametrize("option", ["--width", "--height"])
+@pytest.mark.parametrize("value", ["0", "-5"])
+def test_image_size_must_be_positive(option, value, capsys):
+    with pytest.raises(SystemExit):
+        parse_args(["out", option, value])
+    assert f"{option} must be a positive number of pixels" in capsys.readouterr().err
+
+
+def test_smallest_sizes_are_accepted():
+    args = parse_args(["out", "--width", "1", "--height", "3"])
+    assert (args.width, args.height) == (1, 3)
@@ -0,0 +1,33 @@
+# checks of the breadth-first fractal tree against the recursion of c.py
+import math
+import numpy as np
+import pytest
+from tree_geometry import RATIO, SPREAD, TRUNK, tree_vertex_count, tree_vertices
+
+
+def branch_segments(x, y, length, angle, depth, segments, index=0):
+    """
+    The recursion of draw_branch in c.py without OpenGL: records each branch instead of drawing it.
+    Branches are stored in heap order (children of branch k at 2k+1 and 2k+2), the order of tree_vertices.
+    """
+    if depth == 0:
+        return
+    x_end = x + length * math.cos(angle)
+    y_end = y + length * math.sin(angle)
+    segments[index] = (x, y, x_end, y_end)
+    branch_segments(x_end, y_end, length * RATIO, angle + SPREAD, depth - 1, segments, 2 * index + 1)  # Right
+    branch_segments(x_end, y_end, length * RATIO, angle - SPREAD, depth - 1, segments, 2 * index + 2)  # Left
+
+
+@pytest.mark.parametrize("depth", [1, 2, 5, 10])
+def test_tree_vertices_match_draw_branch(depth):
+    (x, y), length, heading = TRUNK
+    expected = np.empty((2 ** depth - 1, 4))
+    branch_segments(x, y, length, heading, depth, expected)
+    assert np.allclose(tree_vertices(depth).reshape(-1, 4), expected, atol=1e-6)
+
+
+def test_smaller_trees_are_prefixes():
+    vertices = tree_vertices(8)
+    for depth in range(1, 8):
+        assert np.array_equal(vertices[:tree_vertex_count(depth)], tree_vertices(depth))
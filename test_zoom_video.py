@@ -0,0 +1,40 @@
+# checks of the zoom-video frame pipeline
+import numpy as np
+import pytest
+from zoom_video import _render_run, batched, cpu_render, interpolate_keyframes
+
+WIDTH, HEIGHT = 48, 27
+PIXEL = 2 * 0.01 / HEIGHT  # Pixel spacing at zoom 0.01
+
+PATHS = {
+    # Three whole pixels right and one down per frame, with a rising limit
+    "pan": [{"frame": 0, "pos_x": -0.75, "pos_y": 0.1, "zoom": 0.01, "max_iters": 200},
+            {"frame": 8, "pos_x": -0.75 + 24 * PIXEL, "pos_y": 0.1 - 8 * PIXEL, "zoom": 0.01, "max_iters": 300}],
+    # A slow pan of a third of a pixel per frame
+    "slow pan": [{"frame": 0, "pos_x": -0.75, "pos_y": 0.1, "zoom": 0.01, "max_iters": 200},
+                 {"frame": 9, "pos_x": -0.75 + 3 * PIXEL, "pos_y": 0.1, "zoom": 0.01, "max_iters": 200}],
+    "zoom": [{"frame": 0, "pos_x": -0.75, "pos_y": 0.1, "zoom": 0.01, "max_iters": 200},
+             {"frame": 8, "pos_x": -0.75, "pos_y": 0.1, "zoom": 0.001, "max_iters": 400}],
+}
+
+
+def render(path, run_length):
+    frames = list(interpolate_keyframes(PATHS[path]))
+    return [result for run in batched(frames, run_length) for result in _render_run((run, WIDTH, HEIGHT))]
+
+
+@pytest.mark.parametrize("path", sorted(PATHS))
+def test_frames_match_fresh_renders_whatever_the_run_length(path):
+    for run_length in (1, 3, 9):
+        for frame, state, iters, fraction, _ in render(path, run_length):
+            limit = int(state["max_iters"])
+            expected = cpu_render.EscapeState(cpu_render.view_points(state, WIDTH, HEIGHT)).result(limit)
+            assert np.array_equal(iters, expected[0]), (frame, run_length)
+            rgb = cpu_render.shade(iters, fraction, state["max_iters"])
+            assert np.abs(rgb.astype(int) - cpu_render.shade(*expected, limit)).max() <= 1, (frame, run_length)
+
+
+def test_whole_pixel_pans_reuse_pixels():
+    ratios = [reuse_ratio for *_, reuse_ratio in render("pan", 9)]
+    assert ratios[0] == 0.0
+    assert min(ratios[1:]) > 0.8
@@ -0,0 +1,50 @@
+# fractal tree geometry (no OpenGL), used by c.py
+import math
+import numpy as np
+
+# Trunk drawn by c.py: starting point, length and heading
+TRUNK = ((0.0, -0.8), 0.5, math.pi / 2)
+SPREAD = math.pi / 6  # Turn of each child branch from its parent
+RATIO = 0.67  # Length of a child branch relative to its parent
+
+
+def tree_vertices(depth, trunk=TRUNK, spread=SPREAD, ratio=RATIO):
+    """
+    Builds the fractal tree breadth first with NumPy, one vectorized step per level.
+    Every branch of a level turns its parent's heading by +-spread and has the same length, so
+    headings are kept as a number of turns into a precomputed table of directions and lengths
+    come from a table per level; a level is two array operations on the ends of the one before.
+    Levels are stored one after another, so the tree of any smaller depth is a prefix of the buffer.
+    :param depth: Number of levels (2**depth - 1 branches).
+    :param trunk: ((x, y), length, heading) of the first branch.
+    :param spread: Turn of each child branch from its parent, in radians.
+    :param ratio: Length of a child branch relative to its parent.
+    :return: (2 * (2**depth - 1), 2) float32 array of branch start and end points, for GL_LINES.
+    """
+    (x, y), length, heading = trunk
+    # Direction of a branch turned `turns` times from the trunk, for turns in -depth..depth
+    turns = np.arange(-depth, depth + 1)
+    directions = np.exp(1j * (heading + turns * spread))
+    lengths = length * ratio ** np.arange(depth)
+
+    # complex64 is laid out as (x, y) float32 pairs, so the buffer is already a vertex array
+    lines = np.empty((2 ** depth - 1, 2), dtype=np.complex64)
+    starts = np.array([complex(x, y)])
+    index = np.array([depth])  # Position of every branch of the level in the direction table
+    first = 0
+    for level in range(depth):
+        ends = starts + lengths[level] * directions[index]
+        lines[first:first + starts.size, 0] = starts
+        lines[first:first + starts.size, 1] = ends
+        first += starts.size
+        if level + 1 < depth:
+            starts = np.repeat(ends, 2)  # Both children start at their parent's end
+            index = (index[:, np.newaxis] + np.array([1, -1])).reshape(-1)  # Right and left child
+    return lines.reshape(-1).view(np.float32).reshape(-1, 2)
+
+
+def tree_vertex_count(depth):
+    """
+    :return: Number of vertices of the tree of the given depth (the prefix of tree_vertices to draw).
+    """
+    return 2 * (2 ** depth - 1)
@@ -0,0 +1,198 @@
+# streaming zoom-video frame renderer
+import argparse
+import json
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+from mandelbrot_viewer import load_viewer_module
+from png_writer import encode_png
+
+# The shader-view CPU renderer lives next to mandelbrot.py
+cpu_render = load_viewer_module("cpu_render")
+
+
+def interpolate_keyframes(keyframes):
+    """
+    Expands a keyframe path into one mandelbrot.py state dict per frame.
+    Centre and max_iters are interpolated linearly, zoom geometrically so the
+    zoom speed looks constant.
+    :param keyframes: List of dicts with frame, pos_x, pos_y, zoom and max_iters, sorted by frame.
+    :return: Generator of (frame_number, state).
+    """
+    for a, b in zip(keyframes, keyframes[1:]):
+        span = b["frame"] - a["frame"]
+        for frame in range(a["frame"], b["frame"]):
+            t = (frame - a["frame"]) / span
+            yield frame, {
+                "pos_x": a["pos_x"] + (b["pos_x"] - a["pos_x"]) * t,
+                "pos_y": a["pos_y"] + (b["pos_y"] - a["pos_y"]) * t,
+                "zoom": math.exp(math.log(a["zoom"]) + (math.log(b["zoom"]) - math.log(a["zoom"])) * t),
+                "max_iters": a["max_iters"] + (b["max_iters"] - a["max_iters"]) * t,
+            }
+    last = keyframes[-1]
+    yield last["frame"], {key: last[key] for key in ("pos_x", "pos_y", "zoom", "max_iters")}
+
+
+def batched(items, size):
+    """
+    Groups a stream into lists of consecutive items.
+    :param items: Iterable.
+    :param size: Items per batch.
+    :return: Generator of lists.
+    """
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def bounded_map(executor, fn, items, in_flight):
+    """
+    Like executor.map, but never has more than in_flight items submitted and not yet consumed,
+    so a long stream runs in constant memory. Results come back in order.
+    :param executor: concurrent.futures executor.
+    :param fn: Function applied to every item.
+    :param items: Iterable of arguments.
+    :param in_flight: Maximum number of pending results.
+    :return: Generator of results.
+    """
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _render_run(job):
+    """
+    Renders a run of consecutive frames in a worker process.
+    Frames of one run share a FrameReuse, so pixels that stay aligned between them are not recomputed:
+    on a pan at a constant zoom and a whole number of pixels per frame, everything but the newly
+    exposed strips. Other paths get no reuse: the sample points of frames at different zooms never
+    line up, and views are rendered exactly where the path puts them rather than snapped to whole
+    pixels, which would make slow pans stutter. The first frame of every run is computed in full.
+    The run iterates at the highest limit of its frames, since a frame only reuses pixels computed
+    at the same limit, and each frame is then cut back to its own limit, exactly as if it had been
+    rendered at it, so the colours do not depend on the run a frame falls in.
+    :param job: (frames, width, height) where frames is a list of (frame_number, state).
+    :return: List of (frame_number, state, iters, fraction, reuse_ratio).
+    """
+    frames, width, height = job
+    max_iters = max(int(state["max_iters"]) for _, state in frames)
+    reuse = cpu_render.FrameReuse(snap=False)
+    out = []
+    for frame, state in frames:
+        iters, fraction = reuse.render(dict(state, max_iters=max_iters), width, height)
+        limit = int(state["max_iters"])
+        if limit < max_iters:
+            iters = np.minimum(iters, limit)  # Escaped at or after the frame's limit: not escaped at it
+        out.append((frame, state, iters, fraction, reuse.stats["reuse_ratio"]))
+    return out
+
+
+def compute_stage(frames, width, height, executor, run_length, in_flight):
+    """
+    Computes escape data for a stream of frames on a process pool.
+    :return: Generator of (frame_number, state, iters, fraction, reuse_ratio) in frame order.
+    """
+    jobs = ((run, width, height) for run in batched(frames, run_length))
+    for run in bounded_map(executor, _render_run, jobs, in_flight):
+        yield from run
+
+
+def colour_stage(frames):
+    """
+    Colours computed frames with the shader's palette.
+    :return: Generator of (frame_number, rgb, reuse_ratio) with row 0 at the top of the image.
+    """
+    for frame, state, iters, fraction, reuse_ratio in frames:
+        yield frame, cpu_render.shade(iters, fraction, state["max_iters"])[::-1], reuse_ratio
+
+
+def _encode(item):
+    frame, rgb, reuse_ratio = item
+    return frame, encode_png(rgb), reuse_ratio
+
+
+def encode_stage(frames, executor, in_flight):
+    """
+    PNG-encodes coloured frames on a thread pool (zlib releases the GIL).
+    :return: Generator of (frame_number, png_bytes, reuse_ratio).
+    """
+    return bounded_map(executor, _encode, frames, in_flight)
+
+
+def write_stage(frames, output_dir):
+    """
+    Writes encoded frames as numbered PNG files.
+    :return: Generator of (frame_number, path, reuse_ratio).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    for frame, data, reuse_ratio in frames:
+        path = os.path.join(output_dir, f"frame_{frame:06d}.png")
+        with open(path, "wb") as f:
+            f.write(data)
+        yield frame, path, reuse_ratio
+
+
+def render_video(keyframes, output_dir, width, height, workers=None, run_length=4, in_flight=None):
+    """
+    Renders a keyframed zoom path to numbered PNG frames.
+    At most in_flight runs of run_length frames are being computed or waiting to be
+    written at any time, so memory does not grow with the number of frames.
+    The frames can be assembled with e.g. ffmpeg -i frame_%06d.png.
+    :param keyframes: List of keyframe dicts (see interpolate_keyframes).
+    :param output_dir: Directory for the frames.
+    :param width: Frame width in pixels.
+    :param height: Frame height in pixels.
+    :param workers: Compute processes (defaults to the CPU count).
+    :param run_length: Consecutive frames rendered by one worker task.
+    :param in_flight: Maximum pending tasks per stage (defaults to twice the worker count).
+    :return: Generator of (frame_number, path, reuse_ratio) as frames are written.
+    """
+    workers = workers or os.cpu_count() or 1
+    in_flight = in_flight or 2 * workers
+    with ProcessPoolExecutor(workers) as compute_pool, ThreadPoolExecutor(2) as encode_pool:
+        frames = interpolate_keyframes(sorted(keyframes, key=lambda k: k["frame"]))
+        computed = compute_stage(frames, width, height, compute_pool, run_length, in_flight)
+        encoded = encode_stage(colour_stage(computed), encode_pool, in_flight)
+        yield from write_stage(encoded, output_dir)
+
+
+def main(argv=None):
+    """
+    Command-line entry point: zoom_video.py keyframes.json output_dir.
+    """
+    parser = argparse.ArgumentParser(description="Render a keyframed Mandelbrot zoom to PNG frames.")
+    parser.add_argument("keyframes", help="JSON list of {frame, pos_x, pos_y, zoom, max_iters}")
+    parser.add_argument("output_dir")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--run-length", type=int, default=4, help="Consecutive frames per worker task")
+    parser.add_argument("--in-flight", type=int, default=None, help="Maximum pending tasks per stage")
+    args = parser.parse_args(argv)
+
+    with open(args.keyframes) as f:
+        keyframes = json.load(f)
+    start = time.perf_counter()
+    count = 0
+    for frame, path, reuse_ratio in render_video(keyframes, args.output_dir, args.width, args.height,
+                                                 args.workers, args.run_length, args.in_flight):
+        count += 1
+        print(f"frame {frame}: {path} (reused {reuse_ratio:.1%})")
+    elapsed = time.perf_counter() - start
+    print(f"{count} frames in {elapsed:.2f}s ({count / elapsed:.2f} frames/s)")
+
+
+if __name__ == "__main__":
+    main()